@@ -0,0 +1,54 @@
+import os
+import re
+
+# Ventanas para el embedder (all-mpnet-base-v2 trunca en 384 tokens)
+EMBED_WINDOW_TOKENS = int(os.getenv("EMBED_WINDOW_TOKENS", "350"))
+EMBED_WINDOW_OVERLAP = int(os.getenv("EMBED_WINDOW_OVERLAP", "50"))
+
+# Ventanas para los prompts de extracción (Gemini)
+LLM_WINDOW_TOKENS = int(os.getenv("LLM_WINDOW_TOKENS", "6000"))
+LLM_WINDOW_OVERLAP = int(os.getenv("LLM_WINDOW_OVERLAP", "200"))
+
+# Aproximación sin tokenizer: palabras y signos sueltos
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+class TokenChunker:
+    """
+    Parte el texto de una sección en ventanas de como máximo `max_tokens`
+    tokens con `overlap` tokens de solapamiento. Las ventanas son cortes del
+    texto original (vía offsets), así que no se pierde ni se altera texto.
+
+    Con un tokenizer HF (p.ej. embedder.tokenizer) cuenta tokens reales; sin él
+    usa una aproximación por palabras/signos.
+    """
+
+    def __init__(self, max_tokens, overlap=0, tokenizer=None):
+        if overlap >= max_tokens:
+            raise ValueError("overlap debe ser menor que max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.tokenizer = tokenizer
+
+    def _offsets(self, text):
+        if self.tokenizer is not None:
+            enc = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+            return enc["offset_mapping"]
+        return [m.span() for m in _TOKEN_RE.finditer(text)]
+
+    def spans(self, text):
+        """Lista de (char_start, char_end) de cada ventana."""
+        offsets = self._offsets(text)
+        if len(offsets) <= self.max_tokens:
+            return [(0, len(text))]
+
+        step = self.max_tokens - self.overlap
+        spans = []
+        for i in range(0, len(offsets), step):
+            window = offsets[i:i + self.max_tokens]
+            spans.append((window[0][0], window[-1][1]))
+            if i + self.max_tokens >= len(offsets): break
+        return spans
+
+    def split(self, text):
+        return [text[a:b] for a, b in self.spans(text)]
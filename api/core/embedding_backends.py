@@ -0,0 +1,90 @@
+import os
+import numpy as np
+
+# Backend del embedder: 'torch' (SentenceTransformer clásico), 'onnx' (ONNX Runtime)
+# u 'onnx-int8' (ONNX Runtime con pesos cuantizados dinámicamente a int8)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Hilos intra-op del backend (0 = lo que decida el runtime)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# Dónde se guardan los modelos exportados/cuantizados (se generan una vez)
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join(os.getenv("HF_HOME", "data_models"), "onnx"))
+# Kernels de la cuantización: 'avx2' (portable), 'avx512', 'avx512_vnni', 'arm64'
+EMBEDDING_QUANT_CONFIG = os.getenv("EMBEDDING_QUANT_CONFIG", "avx2")
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def _require_onnx(backend):
+    """Falla al arrancar (no en el primer encode) si falta el runtime ONNX."""
+    import importlib.util
+    missing = [m for m in ("onnxruntime", "optimum") if importlib.util.find_spec(m) is None]
+    if missing:
+        raise ImportError(f"EMBEDDING_BACKEND={backend} requiere {', '.join(missing)}: "
+                          "pip install 'optimum[onnxruntime]'")
+
+
+def _session_options(threads):
+    import onnxruntime as ort
+    so = ort.SessionOptions()
+    if threads:
+        so.intra_op_num_threads = threads
+    return so
+
+
+def _export_int8(model_name, quant_config):
+    """Exporta el modelo a ONNX y lo cuantiza (int8 dinámico) en EMBEDDING_ONNX_DIR; devuelve (ruta, archivo)."""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    local = os.path.join(EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+    suffix = f"qint8_{quant_config}"
+    file_name = f"onnx/model_{suffix}.onnx"
+    if not os.path.exists(os.path.join(local, file_name)):
+        print(f" Exportando {model_name} a ONNX int8 ({quant_config}) en {local}...")
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model.save_pretrained(local)
+        export_dynamic_quantized_onnx_model(model, quant_config, local, file_suffix=suffix)
+    return local, file_name
+
+
+def load_embedder(model_name, backend=None, threads=None, quant_config=None):
+    """
+    SentenceTransformer con el backend indicado; misma interfaz encode()/tokenizer
+    en los tres casos, así que TenderPipeline no distingue.
+
+    Los vectores ONNX/int8 conviven con los vector(768) existentes: misma
+    dimensión y mismo espacio (ver cosine_parity y benchmarks/bench_embedding_backends.py).
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or EMBEDDING_BACKEND
+    threads = EMBEDDING_THREADS if threads is None else threads
+    if backend not in BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND no soportado: {backend}")
+
+    print(f" Loading embedding model ({model_name}, backend={backend}, threads={threads or 'auto'})...")
+    if backend == "torch":
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name, device="cpu")
+
+    _require_onnx(backend)
+    model_kwargs = {"provider": "CPUExecutionProvider", "session_options": _session_options(threads)}
+    if backend == "onnx":
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    local, file_name = _export_int8(model_name, quant_config or EMBEDDING_QUANT_CONFIG)
+    return SentenceTransformer(local, device="cpu", backend="onnx", model_kwargs={**model_kwargs, "file_name": file_name})
+
+
+def cosine_parity(reference, candidate):
+    """
+    Coseno fila a fila entre dos matrices de embeddings de los mismos textos
+    (p.ej. torch vs int8). Devuelve media, mínimo y percentil 1.
+    """
+    a = np.asarray(reference, dtype=np.float32)
+    b = np.asarray(candidate, dtype=np.float32)
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    cos = np.sum(a * b, axis=1)
+    return {"mean": float(cos.mean()), "min": float(cos.min()), "p01": float(np.percentile(cos, 1))}
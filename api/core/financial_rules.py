@@ -0,0 +1,109 @@
+import numbers
+from decimal import Decimal
+import numpy as np
+from scipy import sparse
+
+# Operadores soportados por _check_financiero; cualquier otro se da por cumplido
+OPERADORES = {'>=': 0, '<=': 1, '=': 2}
+
+
+def _parse_umbral(valor):
+    """Umbral numérico del requisito, o None si no es numérico (p.ej. "Cumple")."""
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _valor_empresa(valor):
+    """Indicador de la empresa como float; lo no numérico es NaN (nunca cumple)."""
+    if isinstance(valor, (numbers.Real, Decimal)):
+        return float(valor)
+    return np.nan
+
+
+class FinancialRules:
+    """
+    Requisitos financieros de muchas licitaciones compilados a arrays
+    columnares (una fila por regla, agrupadas por licitación como un CSR):
+    licitación, id de concepto, código de operador y umbral.
+
+    Evaluar una empresa (o muchas) es un gather de sus indicadores por
+    concepto y una comparación vectorizada; el resultado y el texto de las
+    alertas son los mismos que los de _check_financiero.
+    """
+
+    def __init__(self, requisitos_por_licitacion):
+        self.concept_ids = {}
+        tender, concept, op, umbral = [], [], [], []
+        self.reglas = []  # (concepto, operador) por regla, para las alertas
+        offsets = [0]
+
+        for i, requisitos in enumerate(requisitos_por_licitacion):
+            for req in requisitos or []:
+                operador = req.get('operador')
+                valor_req = _parse_umbral(req.get('valor_requerido'))
+                # Umbral no numérico u operador desconocido: la regla no puede fallar
+                if valor_req is None or operador not in OPERADORES: continue
+                concepto = req.get('concepto')
+                tender.append(i)
+                concept.append(self.concept_ids.setdefault(concepto, len(self.concept_ids)))
+                op.append(OPERADORES[operador])
+                umbral.append(valor_req)
+                self.reglas.append((concepto, operador))
+            offsets.append(len(tender))
+
+        self.n_licitaciones = len(offsets) - 1
+        self.tender = np.asarray(tender, dtype=np.int64)
+        self.concept = np.asarray(concept, dtype=np.int64)
+        self.op = np.asarray(op, dtype=np.int8)
+        self.umbral = np.asarray(umbral, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.conceptos = list(self.concept_ids)
+        # Pertenencia regla -> licitación, para sumar fallas de muchas empresas en un producto
+        self._membership = sparse.csr_matrix(
+            (np.ones(len(tender)), (np.arange(len(tender)), self.tender)),
+            shape=(len(tender), self.n_licitaciones)
+        )
+
+    def company_values(self, indicadores):
+        """Vector de indicadores alineado con los conceptos compilados (ausente = 0)."""
+        return np.array([_valor_empresa(indicadores.get(c, 0)) for c in self.conceptos], dtype=np.float64)
+
+    def _fallas(self, valores):
+        """valores: (..., n_conceptos) -> (..., n_reglas) con True donde la regla falla."""
+        v = valores[..., self.concept]
+        with np.errstate(invalid='ignore'):
+            cumple = np.where(self.op == 0, v >= self.umbral,
+                              np.where(self.op == 1, v <= self.umbral, v == self.umbral))
+        return ~cumple
+
+    def evaluate(self, indicadores):
+        """
+        Una empresa contra todas las licitaciones.
+        Devuelve (cumple por licitación, falla por regla).
+        """
+        fallas = self._fallas(self.company_values(indicadores))
+        n_fallas = np.bincount(self.tender, weights=fallas, minlength=self.n_licitaciones)
+        return n_fallas == 0, fallas
+
+    def evaluate_many(self, indicadores_empresas):
+        """Muchas empresas contra todas las licitaciones: matriz (empresas x licitaciones) de cumple."""
+        valores = np.stack([self.company_values(ind) for ind in indicadores_empresas]) \
+            if indicadores_empresas else np.zeros((0, len(self.conceptos)))
+        fallas = self._fallas(valores).astype(np.float64)
+        n_fallas = (self._membership.T @ fallas.T).T
+        return n_fallas == 0
+
+    def alertas(self, i, indicadores, fallas=None):
+        """Alertas de la licitación i con el mismo formato que _check_financiero."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if fallas is None:
+            fallas = self._fallas(self.company_values(indicadores))
+        alertas = []
+        for r in range(start, end):
+            if not fallas[r]: continue
+            concepto, operador = self.reglas[r]
+            val_emp = indicadores.get(concepto, 0)
+            alertas.append(f"Falla {concepto}: Tienes {val_emp}, piden {operador} {float(self.umbral[r])}")
+        return alertas
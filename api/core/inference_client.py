@@ -0,0 +1,182 @@
+import os
+import json
+import socket
+import threading
+import http.client
+from urllib.parse import urlparse
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from api.core.model_registry import EMBEDDING_MODEL
+
+# Servidor de inferencia compartido (api/inference_server.py). Sin valor, cada
+# proceso carga sus propios modelos vía el registro.
+#   unix:///tmp/licita-inference.sock   |   http://127.0.0.1:8100
+INFERENCE_SERVER_URL = os.getenv("INFERENCE_SERVER_URL")
+# Imágenes por memoria compartida (mismo host/IPC); con 0 viajan en el cuerpo HTTP
+INFERENCE_SHM = os.getenv("INFERENCE_SHM", "1") == "1"
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "600"))
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+class InferenceClient:
+    """
+    Cliente del servidor de inferencia: los modelos viven en un único proceso
+    y los workers de API/ingesta solo envían textos e imágenes.
+
+    - Embeddings: la respuesta es float32 crudo que se lee con np.frombuffer
+      (sin JSON ni copia).
+    - Visión: los píxeles RGB de todas las páginas del lote se escriben en un
+      bloque de memoria compartida y por HTTP solo viajan nombre, offsets y
+      tamaños.
+
+    Conexión keep-alive por hilo (http.client no es thread-safe).
+    """
+
+    def __init__(self, url, timeout=INFERENCE_TIMEOUT, use_shm=INFERENCE_SHM):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("unix", "http"):
+            raise ValueError(f"INFERENCE_SERVER_URL no soportada: {url}")
+        self.url = url
+        self._parsed = parsed
+        self.timeout = timeout
+        self.use_shm = use_shm
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._parsed.scheme == "unix":
+                conn = _UnixHTTPConnection(self._parsed.path, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self._parsed.hostname, self._parsed.port or 80, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method, path, body=None, headers=None):
+        # Un reintento si el servidor cerró la conexión keep-alive
+        for intento in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (ConnectionError, http.client.HTTPException, OSError):
+                conn.close()
+                self._local.conn = None
+                if intento: raise
+        if resp.status != 200:
+            raise InferenceError(f"{method} {path}: HTTP {resp.status} {data[:200]!r}")
+        return resp, data
+
+    def health(self):
+        _, data = self._request("GET", "/health")
+        return json.loads(data)
+
+    def encode(self, texts, batch_size=64, **_):
+        """Misma forma de llamada que SentenceTransformer.encode; devuelve un ndarray float32."""
+        single = isinstance(texts, str)
+        body = json.dumps({"texts": [texts] if single else list(texts), "batch_size": batch_size})
+        resp, data = self._request("POST", "/embed", body=body, headers={"Content-Type": "application/json"})
+        n, d = (int(x) for x in resp.getheader("X-Shape").split(","))
+        vecs = np.frombuffer(data, dtype=np.float32).reshape(n, d)
+        return vecs[0] if single else vecs
+
+    def analizar_imagenes(self, images_by_key, task_prompt="<MORE_DETAILED_CAPTION>", text_input=None, parciales=None):
+        """Equivalente remoto de ai_engine.analizar_imagenes_con_florence."""
+        keys = list(images_by_key)
+        if not keys: return {}
+        images = [images_by_key[k].convert("RGB") for k in keys]
+
+        layout, offset = [], 0
+        for image in images:
+            size = image.width * image.height * 3
+            layout.append({"offset": offset, "width": image.width, "height": image.height})
+            offset += size
+
+        meta = {"task_prompt": task_prompt, "text_input": text_input, "images": layout}
+        shm = None
+        try:
+            if self.use_shm:
+                shm = shared_memory.SharedMemory(create=True, size=max(1, offset))
+                for image, item in zip(images, layout):
+                    shm.buf[item["offset"]:item["offset"] + image.width * image.height * 3] = image.tobytes()
+                meta["shm"] = shm.name
+                body = b""
+            else:
+                body = b"".join(image.tobytes() for image in images)
+
+            _, data = self._request("POST", "/caption", body=body, headers={
+                "Content-Type": "application/octet-stream",
+                "X-Inference-Meta": json.dumps(meta)
+            })
+        except Exception as e:
+            print(f"❌ Servidor de inferencia (visión): {e}")
+            return {k: "" for k in keys}
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        respuesta = json.loads(data)
+        if parciales is not None:
+            parciales.update(keys[i] for i in respuesta.get("parciales", []))
+        return dict(zip(keys, respuesta["resultados"]))
+
+
+class RemoteEmbedder:
+    """
+    Sustituto de SentenceTransformer para TenderPipeline: encode() va al
+    servidor; el tokenizer (solo para las ventanas del chunker, unos MB) se
+    carga en local y, si no está disponible, el chunker usa su aproximación.
+    """
+
+    def __init__(self, client, model_name=EMBEDDING_MODEL):
+        self.client = client
+        self.model_name = model_name
+        self._tokenizer = None
+        self._tokenizer_loaded = False
+
+    def encode(self, texts, batch_size=64, **kwargs):
+        return self.client.encode(texts, batch_size=batch_size, **kwargs)
+
+    @property
+    def tokenizer(self):
+        if not self._tokenizer_loaded:
+            self._tokenizer_loaded = True
+            try:
+                from transformers import AutoTokenizer
+                name = self.model_name if "/" in self.model_name else f"sentence-transformers/{self.model_name}"
+                self._tokenizer = AutoTokenizer.from_pretrained(name)
+            except Exception as e:
+                print(f" Tokenizer local no disponible ({e}); ventanas por aproximación.")
+        return self._tokenizer
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_inference_client():
+    """Cliente compartido del proceso, o None si no hay INFERENCE_SERVER_URL."""
+    global _client
+    if not INFERENCE_SERVER_URL: return None
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient(INFERENCE_SERVER_URL)
+        return _client
@@ -5,15 +5,19 @@ from openai import OpenAI
 from sentence_transformers import SentenceTransformer
 
 # Importaciones locales
-from database.connection import get_db_connection
+from database.connection import db_connection
 from pdf_utils import PDFResilientParser
 from ai_schemas import TaxonomyPrediction, LicitacionHabilitantes
+from llm_cache import get_llm_cache
 
 # CONFIG
 client = OpenAI(api_key="TU_API_KEY_AQUI")
 print(" Cargando modelo de vectores...")
 embedder = SentenceTransformer('all-MiniLM-L6-v2') 
 
+LLM_MODEL = "gpt-4o-2024-08-06"
+EXTRACTION_PROMPT_VERSION = "master-extraction-v1"
+
 class MasterPipeline:
     def __init__(self):
         self.pdf_parser = PDFResilientParser()
@@ -77,7 +81,8 @@ class MasterPipeline:
                          final_json_structure["requisitos_habilitantes"]["experiencia"] = exp_dict
 
         # 4. VECTOR GLOBAL DEL DOCUMENTO
-        doc_vector = embedder.encode(taxonomy.familia_principal + " " + summary_text[:500]).tolist()
+        # numpy float32 directo: pgvector lo adapta al insertar (los del JSON sí van como lista)
+        doc_vector = embedder.encode(taxonomy.familia_principal + " " + summary_text[:500])
 
         # 5. GUARDAR
         self._save_to_postgres(lic_id_interno, taxonomy, final_json_structure, doc_vector)
@@ -108,23 +113,32 @@ class MasterPipeline:
             return TaxonomyPrediction(codigos_sugeridos=[], familia_principal="N/A", confianza=0)
 
     def _extract_requirements_llm(self, text, category):
-        """Usa el Schema Maestro LicitacionHabilitantes"""
+        """Usa el Schema Maestro LicitacionHabilitantes (con caché de respuestas)"""
+        system_prompt = f"Extrae requisitos de tipo {category}. Si es Experiencia, llena el objeto experiencia."
+        cache = get_llm_cache()
+        key = None
+        if cache:
+            key = cache.make_key(LLM_MODEL, EXTRACTION_PROMPT_VERSION, system_prompt, text)
+            cached = cache.get(key)
+            if cached is not None:
+                return LicitacionHabilitantes.model_validate_json(cached)
         try:
-            return client.beta.chat.completions.parse(
-                model="gpt-4o-2024-08-06",
+            parsed = client.beta.chat.completions.parse(
+                model=LLM_MODEL,
                 messages=[
-                    {"role": "system", "content": f"Extrae requisitos de tipo {category}. Si es Experiencia, llena el objeto experiencia."},
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": text}
                 ],
                 response_format=LicitacionHabilitantes
             ).choices[0].message.parsed
+            if key and parsed is not None:
+                cache.set(key, parsed.model_dump_json())
+            return parsed
         except Exception as e:
             print(f"Error LLM: {e}")
             return None
 
     def _save_to_postgres(self, lic_id, taxonomy, full_json, vector):
-        conn = get_db_connection()
-        cur = conn.cursor()
         sql = """
             INSERT INTO public_licitacion (
                 codigo_proceso, entidad, objeto, codigos_unspsc, 
@@ -133,12 +147,13 @@ class MasterPipeline:
             ON CONFLICT (codigo_proceso) DO UPDATE 
             SET metadatos_json = EXCLUDED.metadatos_json;
         """
-        cur.execute(sql, (
-            lic_id, "Privada", taxonomy.familia_principal, 
-            taxonomy.codigos_sugeridos, vector, json.dumps(full_json)
-        ))
-        conn.commit()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, (
+                lic_id, "Privada", taxonomy.familia_principal, 
+                taxonomy.codigos_sugeridos, vector, json.dumps(full_json)
+            ))
+            conn.commit()
 
 if __name__ == "__main__":
     pipeline = MasterPipeline()
@@ -0,0 +1,140 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# --- CONFIGURACIÓN ---
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite")
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "512"))
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+
+
+class ResponseCache:
+    """
+    Caché persistente direccionada por contenido (SQLite en disco local).
+
+    - Clave: sha256 de las partes que definen la respuesta
+      (modelo, versión del prompt, texto del prompt...).
+    - Expiración por TTL y desalojo LRU cuando se supera `max_bytes`.
+    - Contadores hit/miss persistidos en la misma base, así los ve cualquier
+      proceso (API, workers) que apunte al mismo archivo.
+    """
+
+    def __init__(self, path, max_bytes, ttl_seconds, namespace="llm"):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,
+                created_at REAL NOT NULL, last_access REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS stats (
+                namespace TEXT NOT NULL, counter TEXT NOT NULL, value INTEGER NOT NULL,
+                PRIMARY KEY (namespace, counter)
+            )""")
+
+    @staticmethod
+    def make_key(*parts):
+        h = hashlib.sha256()
+        for p in parts:
+            h.update(str(p).encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row:
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._incr("hits" if row else "misses")
+        return row[0] if row else None
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._incr("stores")
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._conn.execute(
+                "SELECT counter, value FROM stats WHERE namespace = ?", (self.namespace,)
+            ).fetchall())
+            n, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "namespace": self.namespace,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "stores": counters.get("stores", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": n,
+            "size_bytes": total,
+            "max_bytes": self.max_bytes
+        }
+
+    # --- INTERNOS (llamar con el lock tomado) ---
+    def _incr(self, counter, n=1):
+        self._conn.execute("""
+            INSERT INTO stats (namespace, counter, value) VALUES (?, ?, ?)
+            ON CONFLICT (namespace, counter) DO UPDATE SET value = value + excluded.value
+        """, (self.namespace, counter, n))
+
+    def _evict(self):
+        if self.ttl_seconds:
+            cur = self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            if cur.rowcount > 0: self._incr("evictions", cur.rowcount)
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes: return
+
+        # LRU: borramos los menos usados hasta quedar en el 90% del límite
+        target = total - int(self.max_bytes * 0.9)
+        freed, victims = 0, []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= target: break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._incr("evictions", len(victims))
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Caché compartida de respuestas LLM (None si LLM_CACHE_ENABLED=0)."""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED: return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = ResponseCache(
+                LLM_CACHE_PATH,
+                max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+                ttl_seconds=LLM_CACHE_TTL_DAYS * 86400,
+                namespace="llm"
+            )
+        return _llm_cache
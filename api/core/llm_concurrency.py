@@ -0,0 +1,88 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """
+    Rate limiter de tipo token bucket (thread-safe).
+    `rate` tokens por segundo, hasta `capacity` acumulados (ráfaga).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1.0):
+        """Bloquea hasta que haya `tokens` disponibles."""
+        if self.rate <= 0: return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """Vacía el bucket tras un 429 para que todos los hilos frenen a la vez."""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+def is_rate_limit_error(e):
+    """Detecta un 429 / RESOURCE_EXHAUSTED venga del SDK que venga."""
+    code = getattr(e, "code", None) or getattr(e, "status_code", None)
+    if code == 429: return True
+    if getattr(getattr(e, "response", None), "status_code", None) == 429: return True
+    # Solo el estado gRPC: un "429" suelto en el texto puede ser un id o un número de página
+    return getattr(e, "status", None) == "RESOURCE_EXHAUSTED" or "RESOURCE_EXHAUSTED" in str(e)
+
+
+def _retry_after(e):
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_backoff(fn, bucket=None, max_retries=5, base_delay=1.0, max_delay=30.0):
+    """
+    Ejecuta fn() respetando el rate limiter. Ante un 429 reintenta con backoff
+    exponencial con jitter (o el Retry-After del servidor si viene); cualquier
+    otro error se propaga de inmediato.
+    """
+    attempt = 0
+    while True:
+        if bucket: bucket.acquire()
+        try:
+            return fn()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt >= max_retries:
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            if bucket: bucket.penalize(delay)
+            attempt += 1
+            print(f"  429 recibido, reintento {attempt}/{max_retries} en {delay:.1f}s")
+            time.sleep(delay)
+
+
+def map_bounded(fn, items, max_workers):
+    """map() con concurrencia acotada. Devuelve los resultados en el orden de `items`."""
+    items = list(items)
+    if not items: return []
+    if max_workers <= 1 or len(items) == 1:
+        return [fn(x) for x in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(fn, items))
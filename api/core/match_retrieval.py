@@ -0,0 +1,98 @@
+import os
+import numpy as np
+
+from api.core.score_batch import MatchIndex
+
+# Candidatos que devuelve el ANN de pgvector antes del score en Python
+MATCH_CANDIDATES = int(os.getenv("MATCH_CANDIDATES", "200"))
+# Tamaño de la lista dinámica de HNSW por consulta (más alto = más recall, más latencia)
+MATCH_EF_SEARCH = int(os.getenv("MATCH_EF_SEARCH", "100"))
+MATCH_ESTADOS = [e.strip() for e in os.getenv("MATCH_ESTADOS", "ABIERTA").split(",") if e.strip()]
+# Sin iterative scan (pgvector < 0.8) el filtro corre después del HNSW: se
+# piden K*MATCH_OVERSAMPLE vecinos y se recorta a K en Python
+MATCH_OVERSAMPLE = int(os.getenv("MATCH_OVERSAMPLE", "4"))
+HNSW_MAX_EF_SEARCH = 1000  # tope de hnsw.ef_search en pgvector
+
+_iterative_scan = None  # se detecta una vez por proceso
+
+
+def _supports_iterative_scan(cur):
+    """pgvector >= 0.8: HNSW sigue recorriendo el grafo hasta llenar el LIMIT tras el WHERE."""
+    global _iterative_scan
+    if _iterative_scan is None:
+        cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cur.fetchone()
+        version = tuple(int(x) for x in row[0].split(".")[:2]) if row else (0, 0)
+        _iterative_scan = version >= (0, 8)
+    return _iterative_scan
+
+
+def fetch_candidates(cur, perfil_vec, codigos=None, estados=None, k=None, ef_search=None):
+    """
+    Trae las K licitaciones más cercanas al perfil con un ANN de pgvector
+    (ORDER BY objeto_vec <=> perfil LIMIT K), filtrando en SQL por estado y,
+    si se pasan `codigos`, por solape UNSPSC (las que no traen códigos se
+    conservan: en el score taxonómico valen 0.5).
+
+    El filtro se aplica sobre lo que devuelve el HNSW: con la mayoría de
+    licitaciones cerradas, un scan de K vecinos deja muchas menos de K. Con
+    pgvector >= 0.8 se usa iterative scan; si no, se sobremuestrea.
+
+    El coseno sale ya calculado de la consulta, así que no se transfieren
+    los vectores. Corre dentro de la transacción de `cur` (SET LOCAL).
+    """
+    k = k or MATCH_CANDIDATES
+    estados = estados or MATCH_ESTADOS
+    if _supports_iterative_scan(cur):
+        # relaxed_order puede devolver vecinos algo desordenados: se reordena abajo
+        cur.execute("SET LOCAL hnsw.iterative_scan = relaxed_order")
+        limit = k
+    else:
+        limit = min(k * max(1, MATCH_OVERSAMPLE), HNSW_MAX_EF_SEARCH)
+    # ef_search por debajo del LIMIT recorta el resultado: HNSW nunca devuelve más de ef_search filas
+    ef_search = min(max(ef_search or MATCH_EF_SEARCH, limit), HNSW_MAX_EF_SEARCH)
+
+    where = ["estado = ANY(%s)", "objeto_vec IS NOT NULL"]
+    params = [list(estados)]
+    if codigos:
+        where.append("(codigos_unspsc && %s::text[] OR COALESCE(cardinality(codigos_unspsc), 0) = 0)")
+        params.append(list(codigos))
+
+    q = np.asarray(perfil_vec, dtype=np.float32)  # adaptado por pgvector (register_vector)
+    cur.execute("SET LOCAL hnsw.ef_search = %s", (int(ef_search),))
+    cur.execute(f"""
+        SELECT id, codigo_proceso, codigos_unspsc, metadatos_json,
+               1 - (objeto_vec <=> %s::vector) AS semantico
+        FROM public_licitacion
+        WHERE {" AND ".join(where)}
+        ORDER BY objeto_vec <=> %s::vector
+        LIMIT %s
+    """, [q] + params + [q, limit])
+
+    rows = [
+        {"id": r[0], "codigo_proceso": r[1], "codigos_unspsc": r[2] or [],
+         "metadatos_json": r[3] or {}, "semantico": float(r[4])}
+        for r in cur.fetchall()
+    ]
+    rows.sort(key=lambda r: r["semantico"], reverse=True)
+    return rows[:k]
+
+
+def recomendar_licitaciones(cur, empresa_perfil, k=20, candidatos=None, ef_search=None,
+                            estados=None, filtrar_codigos=False):
+    """
+    Top-K de licitaciones para una empresa: pgvector recupera `candidatos`
+    (recall configurable vía candidatos/ef_search) y solo esos pasan por el
+    filtro financiero y el score ponderado de MatchIndex.
+    """
+    codigos = empresa_perfil.get('codigos_unspsc') if filtrar_codigos else None
+    rows = fetch_candidates(cur, empresa_perfil['perfil_vec'], codigos, estados,
+                            max(candidatos or MATCH_CANDIDATES, k), ef_search)
+    if not rows: return []
+
+    index = MatchIndex.from_rows(rows, dim=0)
+    resultados = index.top_k(empresa_perfil, k, semantico=[r["semantico"] for r in rows])
+    codigo_por_id = {r["id"]: r["codigo_proceso"] for r in rows}
+    for res in resultados:
+        res["codigo_proceso"] = codigo_por_id[res["licitacion_id"]]
+    return resultados
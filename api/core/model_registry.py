@@ -0,0 +1,105 @@
+import os
+import time
+import threading
+
+# Modelos a precargar en segundo plano al arrancar (separados por coma)
+MODEL_WARMUP = [m.strip() for m in os.getenv("MODEL_WARMUP", "").split(",") if m.strip()]
+# Modelos que deben estar cargados para que /health/ready responda 200
+READY_REQUIRES_MODELS = [m.strip() for m in os.getenv("READY_REQUIRES_MODELS", "").split(",") if m.strip()]
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-mpnet-base-v2")
+# Tras un fallo de carga no se reintenta hasta pasado este tiempo (evita recargar en cada página)
+MODEL_RETRY_SECONDS = float(os.getenv("MODEL_RETRY_SECONDS", "60"))
+
+
+def _load_embedder():
+    from api.core.embedding_backends import load_embedder
+    embedder = load_embedder(EMBEDDING_MODEL)
+    embedder.encode("warmup")
+    return embedder
+
+
+def _load_florence():
+    from api.core.modelo_pixel import ai_engine
+    return ai_engine.load_model()
+
+
+class ModelRegistry:
+    """
+    Carga perezosa de modelos: cada uno se construye la primera vez que se
+    pide (o en un warmup en segundo plano) y una sola vez por proceso, aunque
+    lo pidan varios hilos a la vez. Importar un módulo ya no carga pesos.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._state = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._state.setdefault(name, {"status": "pending"})
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None: return model
+
+        if name not in self._loaders:
+            raise KeyError(f"Modelo no registrado: {name}")
+        with self._locks[name]:
+            if name in self._models: return self._models[name]
+            state = self._state[name]
+            if state["status"] == "error" and time.monotonic() - state["failed_at"] < MODEL_RETRY_SECONDS:
+                raise RuntimeError(f"{name} no disponible: {state['error']}")
+            self._state[name] = {"status": "loading"}
+            t0 = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._state[name] = {"status": "error", "error": str(e), "failed_at": time.monotonic()}
+                raise
+            self._models[name] = model
+            self._state[name] = {"status": "ready", "load_s": round(time.perf_counter() - t0, 2)}
+            return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warmup(self, names=None, background=True):
+        """Carga los modelos indicados; en segundo plano devuelve el hilo."""
+        names = list(names if names is not None else MODEL_WARMUP)
+
+        def _run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"❌ Warmup de {name} falló: {e}")
+
+        if not background:
+            _run()
+            return None
+        t = threading.Thread(target=_run, name="model-warmup", daemon=True)
+        t.start()
+        return t
+
+    def status(self):
+        with self._lock:
+            return {name: dict(state) for name, state in self._state.items()}
+
+    def ready(self, names=None):
+        names = READY_REQUIRES_MODELS if names is None else names
+        return all(self.is_loaded(n) for n in names)
+
+
+registry = ModelRegistry()
+registry.register("embedder", _load_embedder)
+registry.register("florence", _load_florence)
+
+
+def get_model(name):
+    return registry.get(name)
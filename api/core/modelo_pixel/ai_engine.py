@@ -1,33 +1,111 @@
 from PIL import Image
-from transformers import AutoProcessor, AutoModelForCausalLM
 import torch
 import os
+import time
+from api.core.model_registry import get_model
 
 # --- CONFIGURACIÓN ---
 device = "cuda" if torch.cuda.is_available() else "cpu"
 dtype = torch.float16 if device == "cuda" else torch.float32
 
-model_id = "microsoft/Florence-2-large"
+# Tope de tokens generados por tarea: un caption no necesita los 1024 de un OCR
+TASK_MAX_NEW_TOKENS = {
+    "<CAPTION>": 64,
+    "<DETAILED_CAPTION>": 160,
+    "<MORE_DETAILED_CAPTION>": 384,
+    "<OD>": 512,
+    "<OCR>": 1024,
+    "<OCR_WITH_REGION>": 1024,
+}
 
-print(f"--- FLORENCE ENGINE INIT ---")
-print(f"Device: {device}")
-print(f"Dtype objetivo: {dtype}")
+# Perfiles de visión. 'cpu' y 'cpu-fast' cuantizan los Linear a int8 (dinámico)
+# y ponen un plazo por página (max_time, en segundos): al vencer se corta y se
+# devuelve lo generado. Un lote de N páginas recibe N veces el plazo.
+VISION_PROFILES = {
+    "gpu": {"model_id": "microsoft/Florence-2-large", "quantize": False, "max_time": None, "token_scale": 1.0},
+    "cpu": {"model_id": "microsoft/Florence-2-large", "quantize": True, "max_time": 90.0, "token_scale": 1.0},
+    "cpu-fast": {"model_id": "microsoft/Florence-2-base", "quantize": True, "max_time": 30.0, "token_scale": 0.5},
+}
+# 'auto': gpu si hay CUDA, cpu si no
+VISION_PROFILE = os.getenv("VISION_PROFILE", "auto")
+
+# Batching: tope de imágenes por generate() y memoria estimada por imagen en GPU
+FLORENCE_MAX_BATCH = int(os.getenv("FLORENCE_MAX_BATCH", "16"))
+FLORENCE_CPU_BATCH = int(os.getenv("FLORENCE_CPU_BATCH", "2"))
+FLORENCE_MB_PER_IMAGE = int(os.getenv("FLORENCE_MB_PER_IMAGE", "700"))
+
+
+def resolve_profile(name=None):
+    """Perfil efectivo: el de VISION_PROFILE con los overrides FLORENCE_* del entorno."""
+    name = name or VISION_PROFILE
+    if name == "auto":
+        name = "gpu" if device == "cuda" else "cpu"
+    if name not in VISION_PROFILES:
+        raise ValueError(f"VISION_PROFILE no soportado: {name}")
+    profile = dict(VISION_PROFILES[name], name=name)
+    if os.getenv("FLORENCE_MODEL_ID"):
+        profile["model_id"] = os.getenv("FLORENCE_MODEL_ID")
+    if os.getenv("FLORENCE_QUANTIZE"):
+        profile["quantize"] = os.getenv("FLORENCE_QUANTIZE") == "1"
+    if os.getenv("FLORENCE_MAX_TIME"):
+        profile["max_time"] = float(os.getenv("FLORENCE_MAX_TIME")) or None  # 0 = sin plazo
+    # int8 dinámico solo corre en CPU
+    profile["quantize"] = profile["quantize"] and device == "cpu"
+    return profile
+
+
+def profile_tag(profile):
+    """Identifica la salida de un perfil (clave de la caché de visión)."""
+    tag = profile["model_id"]
+    if profile["quantize"]: tag += "+int8"
+    if profile["token_scale"] != 1.0: tag += f"+t{profile['token_scale']}"
+    return tag
+
+
+def max_new_tokens_for(task_prompt, profile=None):
+    profile = profile or PROFILE
+    return max(16, int(TASK_MAX_NEW_TOKENS.get(task_prompt, 1024) * profile["token_scale"]))
+
+
+PROFILE = resolve_profile()
+model_id = PROFILE["model_id"]
+model_tag = profile_tag(PROFILE)
+
+def load_model(profile=None):
+    """Carga Florence-2 según el perfil (lo invoca el registro de modelos en el primer uso o en el warmup)."""
+    # transformers se importa aquí: solo importarlo ya cuesta segundos
+    from transformers import AutoProcessor, AutoModelForCausalLM
+    profile = profile or PROFILE
+    print(f"--- FLORENCE ENGINE INIT ---")
+    print(f"Perfil: {profile['name']} ({profile['model_id']}, int8={profile['quantize']}, plazo={profile['max_time']}s/página)")
+    print(f"Device: {device}")
+    print(f"Dtype objetivo: {dtype}")
 
-try:
     # Cargamos con 'eager' para evitar errores de SDPA
     model = AutoModelForCausalLM.from_pretrained(
-        model_id, 
+        profile["model_id"], 
         trust_remote_code=True,
         dtype=dtype,
         attn_implementation="eager"
     ).to(device)
-    processor = AutoProcessor.from_pretrained(model_id, trust_remote_code=True)
+    if profile["quantize"]:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    processor = AutoProcessor.from_pretrained(profile["model_id"], trust_remote_code=True)
     print("✅ Modelo cargado.")
-except Exception as e:
-    print(f"❌ ERROR CARGA MODELO: {e}")
-    model = None
+    return model, processor
+
+
+def get_florence():
+    """(model, processor) cargados de forma perezosa; (None, None) si la carga falla."""
+    try:
+        return get_model("florence")
+    except Exception as e:
+        print(f"❌ ERROR CARGA MODELO: {e}")
+        return None, None
 
 def analizar_imagen_con_florence(image_path_or_obj, task_prompt="<MORE_DETAILED_CAPTION>", text_input=None):
+    model, processor = get_florence()
     if model is None: return {"error": "Model not loaded"}
 
     print("--- INICIO DEBUG FLORENCE ---")
@@ -81,7 +159,8 @@ def analizar_imagen_con_florence(image_path_or_obj, task_prompt="<MORE_DETAILED_
         generated_ids = model.generate(
             input_ids=inputs["input_ids"],
             pixel_values=inputs["pixel_values"],
-            max_new_tokens=1024,
+            max_new_tokens=max_new_tokens_for(task_prompt),
+            max_time=PROFILE["max_time"],
             do_sample=False,
             num_beams=1,         
             # early_stopping=False # <--- BORRAR: No sirve con num_beams=1
@@ -111,4 +190,109 @@ def analizar_imagen_con_florence(image_path_or_obj, task_prompt="<MORE_DETAILED_
         return ""
 
 def run_ocr_inference(image, task="<MORE_DETAILED_CAPTION>"):
-    return analizar_imagen_con_florence(image, task_prompt=task)
\ No newline at end of file
+    return analizar_imagen_con_florence(image, task_prompt=task)
+
+# --- INFERENCIA EN LOTE ---
+
+def batch_size_adaptativo(max_batch=FLORENCE_MAX_BATCH):
+    """Cuántas imágenes caben en un generate() según la memoria libre del dispositivo."""
+    if device != "cuda":
+        return max(1, min(max_batch, FLORENCE_CPU_BATCH))
+    free_bytes, _ = torch.cuda.mem_get_info()
+    cabe = int(free_bytes * 0.8 / (FLORENCE_MB_PER_IMAGE * 1024 * 1024))
+    return max(1, min(max_batch, cabe))
+
+
+def _generate_lote(images, task_prompt, text_input=None, profile=None, model=None, processor=None):
+    """
+    Un único model.generate para N imágenes (mismo prompt). Devuelve
+    (resultados, parciales): índices cuya generación cortó el plazo del perfil
+    antes de terminar (salida incompleta).
+    """
+    profile = profile or PROFILE
+    if model is None:
+        model, processor = get_florence()
+    prompt = task_prompt + (text_input if text_input else "")
+    # El processor redimensiona cada página a la resolución del modelo y apila
+    # pixel_values; padding=True iguala los input_ids del lote.
+    inputs = processor(text=[prompt] * len(images), images=images, return_tensors="pt", padding=True)
+
+    # Las páginas del lote se generan juntas: el plazo por página escala con el lote
+    max_time = profile["max_time"] * len(images) if profile["max_time"] else None
+    t0 = time.perf_counter()
+    generated_ids = model.generate(
+        input_ids=inputs["input_ids"].to(device),
+        pixel_values=inputs["pixel_values"].to(device, dtype),
+        max_new_tokens=max_new_tokens_for(task_prompt, profile),
+        max_time=max_time,
+        do_sample=False,
+        num_beams=1,
+    )
+    # Sin EOS y con el plazo vencido: la generación la cortó el tiempo, no el modelo
+    parciales = set()
+    if max_time and time.perf_counter() - t0 >= max_time:
+        eos = processor.tokenizer.eos_token_id
+        parciales = {i for i, row in enumerate(generated_ids) if not (row[1:] == eos).any()}
+    textos = processor.batch_decode(generated_ids, skip_special_tokens=False)
+
+    resultados = []
+    for texto, image in zip(textos, images):
+        parsed = processor.post_process_generation(
+            texto,
+            task=task_prompt,
+            image_size=(image.width, image.height)
+        )
+        if isinstance(parsed, dict) and task_prompt in parsed:
+            parsed = parsed[task_prompt]
+        resultados.append(parsed)
+    return resultados, parciales
+
+
+def analizar_imagenes_con_florence(images_by_key, task_prompt="<MORE_DETAILED_CAPTION>", text_input=None, batch_size=None,
+                                   parciales=None):
+    """
+    Versión en lote de `analizar_imagen_con_florence`.
+
+    Args:
+        images_by_key: dict {clave_pagina: PIL.Image}.
+        batch_size: imágenes por generate(); por defecto se adapta a la memoria libre.
+        parciales: set opcional donde se añaden las claves cuya salida cortó el plazo
+            del perfil (útiles como contexto, pero no deben cachearse).
+    Returns:
+        dict {clave_pagina: resultado}. Una página que falla devuelve "" (igual que la versión unitaria).
+    """
+    model, _ = get_florence()
+    if model is None: return {k: {"error": "Model not loaded"} for k in images_by_key}
+
+    keys = list(images_by_key)
+    images = [images_by_key[k].convert("RGB") for k in keys]
+    bs = batch_size or batch_size_adaptativo()
+    resultados = {}
+
+    i = 0
+    while i < len(keys):
+        grupo = slice(i, i + bs)
+        try:
+            with torch.inference_mode():
+                salida, cortadas = _generate_lote(images[grupo], task_prompt, text_input)
+            resultados.update(zip(keys[grupo], salida))
+            if parciales is not None:
+                parciales.update(keys[i + j] for j in cortadas)
+            if cortadas:
+                print(f"⚠️ Plazo de {PROFILE['max_time']}s/página agotado: {len(cortadas)} página(s) con salida parcial")
+            i += len(salida)
+        except torch.cuda.OutOfMemoryError:
+            torch.cuda.empty_cache()
+            if bs == 1:
+                print(f"❌ OOM incluso con lote 1 en {keys[i]}")
+                resultados[keys[i]] = ""
+                i += 1
+            else:
+                bs = max(1, bs // 2)
+                print(f"⚠️ OOM en Florence, reduciendo lote a {bs}")
+        except Exception as e:
+            print(f"❌ EXCEPCIÓN EN FLORENCE (lote {keys[grupo]}): {e}")
+            for k in keys[grupo]:
+                resultados[k] = ""
+            i += len(keys[grupo])
+    return resultados
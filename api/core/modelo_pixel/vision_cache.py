@@ -0,0 +1,55 @@
+import os
+import json
+import hashlib
+import threading
+
+from api.core.llm_cache import ResponseCache
+
+# --- CONFIGURACIÓN ---
+VISION_CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "1") == "1"
+VISION_CACHE_PATH = os.getenv("VISION_CACHE_PATH", "cache/vision_cache.sqlite")
+VISION_CACHE_MAX_MB = float(os.getenv("VISION_CACHE_MAX_MB", "256"))
+VISION_CACHE_TTL_DAYS = float(os.getenv("VISION_CACHE_TTL_DAYS", "90"))
+
+_vision_cache = None
+_vision_cache_lock = threading.Lock()
+
+
+def get_vision_cache():
+    """Caché de resultados Florence por página (None si VISION_CACHE_ENABLED=0)."""
+    global _vision_cache
+    if not VISION_CACHE_ENABLED: return None
+    with _vision_cache_lock:
+        if _vision_cache is None:
+            _vision_cache = ResponseCache(
+                VISION_CACHE_PATH,
+                max_bytes=VISION_CACHE_MAX_MB * 1024 * 1024,
+                ttl_seconds=VISION_CACHE_TTL_DAYS * 86400,
+                namespace="vision"
+            )
+        return _vision_cache
+
+
+def page_cache_key(cache, pix, task_prompt, model_id):
+    """
+    Clave de una página renderizada: hash de los bytes del pixmap + tamaño +
+    prompt de la tarea + modelo. Páginas idénticas (re-subidas, adendas,
+    anexos repetidos) comparten clave aunque estén en otro PDF.
+    """
+    # samples_mv: vista sin copia de los píxeles (PyMuPDF >= 1.22)
+    page_hash = hashlib.sha256(getattr(pix, "samples_mv", None) or pix.samples).hexdigest()
+    return cache.make_key(model_id, task_prompt, pix.width, pix.height, pix.n, page_hash)
+
+
+def is_cacheable(result):
+    """No se cachean fallos de inferencia (cadena vacía o dict con 'error')."""
+    if not result: return False
+    return not (isinstance(result, dict) and "error" in result)
+
+
+def dumps(result):
+    return json.dumps(result, ensure_ascii=False)
+
+
+def loads(value):
+    return json.loads(value)
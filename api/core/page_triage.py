@@ -0,0 +1,69 @@
+import os
+from dataclasses import dataclass
+
+# Modos de política:
+#   all  -> todas las páginas pasan por Florence (comportamiento original)
+#   auto -> solo las páginas que lo necesitan según las heurísticas de abajo
+#   none -> se omite la visión por completo
+VISION_TRIAGE_POLICY = os.getenv("VISION_TRIAGE_POLICY", "auto")
+
+
+@dataclass
+class TriagePolicy:
+    mode: str = "auto"
+    min_text_chars: int = 200          # Menos texto que esto => escaneo / figura
+    min_image_area_ratio: float = 0.15  # Imágenes cubriendo >= 15% de la página
+    min_drawings: int = 40             # Muchos trazos vectoriales => diagrama / gráfico
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            mode=VISION_TRIAGE_POLICY,
+            min_text_chars=int(os.getenv("VISION_TRIAGE_MIN_TEXT_CHARS", cls.min_text_chars)),
+            min_image_area_ratio=float(os.getenv("VISION_TRIAGE_MIN_IMAGE_RATIO", cls.min_image_area_ratio)),
+            min_drawings=int(os.getenv("VISION_TRIAGE_MIN_DRAWINGS", cls.min_drawings)),
+        )
+
+
+def triage_page(page, policy, n_chars=None):
+    """
+    Decide con PyMuPDF (sin renderizar) si una página necesita visión.
+    Devuelve (necesita_vision, motivo).
+
+    `n_chars`: largo del texto ya extraído por el parser; solo si no se pasa
+    se vuelve a extraer el texto de la página.
+    """
+    if policy.mode == "all": return True, "politica_all"
+    if policy.mode == "none": return False, "politica_none"
+
+    if n_chars is None:
+        n_chars = len(page.get_text("text").strip())
+    if n_chars == 0:
+        return True, "sin_capa_texto"
+
+    page_area = abs(page.rect) or 1.0
+    image_area = 0.0
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        image_area += max(0.0, x1 - x0) * max(0.0, y1 - y0)
+    if image_area / page_area >= policy.min_image_area_ratio:
+        return True, "imagenes"
+
+    if n_chars < policy.min_text_chars:
+        return True, "poco_texto"
+
+    # get_cdrawings es la variante rápida (sin objetos Python por trazo)
+    if len(page.get_cdrawings()) >= policy.min_drawings:
+        return True, "dibujos_vectoriales"
+
+    return False, "solo_texto"
+
+
+def new_triage_report(policy):
+    return {"policy": policy.mode, "pages": 0, "vision_pages": 0, "skipped": 0, "reasons": {}}
+
+
+def record(report, needs_vision, reason):
+    report["pages"] += 1
+    report["vision_pages" if needs_vision else "skipped"] += 1
+    report["reasons"][reason] = report["reasons"].get(reason, 0) + 1
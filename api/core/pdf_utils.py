@@ -1,94 +1,255 @@
 import fitz  # PyMuPDF
+import os
 import re
+import time
+import multiprocessing
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Parseo paralelo por páginas (1 = serial). Por debajo de PDF_PARSE_MIN_PAGES
+# el arranque del pool cuesta más de lo que ahorra.
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "1"))
+PDF_PARSE_MIN_PAGES = int(os.getenv("PDF_PARSE_MIN_PAGES", "16"))
+
+
+def _parse_page_range(args):
+    """Worker del pool: abre el PDF por su cuenta y extrae el rango [start, end)."""
+    pdf_path, start, end = args
+    parser = PDFResilientParser()
+    doc = fitz.open(pdf_path)
+    try:
+        return [parser._extract_page(doc[i]) for i in range(start, end)]
+    finally:
+        doc.close()
+
 
 class PDFResilientParser:
-    def process(self, pdf_path, use_vision=False):
+    def __init__(self, workers=None):
+        # Tiempos del último process() (parse puro, sin el page_hook)
+        self.last_stats = {}
+        self.workers = PDF_PARSE_WORKERS if workers is None else workers
+        self._pool = None
+
+    def process(self, pdf_path, use_vision=False, page_hook=None):
         """
         Procesa el PDF para extraer texto estructurado.
         NOTA: El parámetro 'use_vision' se ignora aquí intencionalmente.
         La visión (Florence-2) ahora se maneja exclusivamente en el Orchestrator
         para evitar errores de importación circular.
+
+        Args:
+            pdf_path: ruta del PDF o un fitz.Document ya abierto (no se cierra).
+            page_hook: callable(page_num, page, page_data) opcional, invocado en
+                la misma pasada sobre cada página (p.ej. el render para visión),
+                así el documento se recorre una sola vez. `page_data` es lo que
+                ya extrajo el parser (texto plano incluido).
+
+        Con `workers` > 1 las páginas se parsean en un pool de procesos (cada
+        worker abre el PDF) y el resultado es idéntico al serial.
         """
         chunks = []
+        owns_doc = isinstance(pdf_path, str)
         try:
-            doc = fitz.open(pdf_path)
+            doc = fitz.open(pdf_path) if owns_doc else pdf_path
             
             # Estrategia: Intentar detección visual de estructura (headers/fonts)
             # si el PDF tiene texto seleccionable.
+            pages = []
             if doc.page_count > 0:
-                chunks = self._process_visual_structure(doc)
+                if self.workers > 1 and doc.page_count >= PDF_PARSE_MIN_PAGES and doc.name:
+                    pages = self._extract_pages_parallel(doc, page_hook)
+                else:
+                    pages = self._extract_pages(doc, page_hook)
+                chunks = self._process_visual_structure(pages)
             
             # Si la estrategia visual falló o no dio resultados, fallback a página por página
             if not chunks:
-                chunks = self._process_simple(doc)
+                chunks = self._process_simple(pages)
                 
-            doc.close()
+            if owns_doc: doc.close()
             return chunks
             
         except Exception as e:
             print(f"Error parsing PDF structure: {e}")
             return []
 
+    def _extract_pages(self, doc, page_hook=None):
+        """Una sola pasada: extrae cada página y cronometra el parseo (excluye el hook)."""
+        pages = []
+        parse_s = 0.0
+        for page_num, page in enumerate(doc):
+            t0 = time.perf_counter()
+            pages.append(self._extract_page(page))
+            parse_s += time.perf_counter() - t0
+            if page_hook: page_hook(page_num, page, pages[-1])
+
+        self._record_stats(len(pages), parse_s, workers=1)
+        return pages
+
+    def _extract_pages_parallel(self, doc, page_hook=None):
+        """
+        Reparte rangos contiguos de páginas en el pool de procesos. A medida que
+        llegan los rangos (en orden), el page_hook (visión) corre aquí sobre el
+        doc abierto mientras los workers siguen con los rangos siguientes.
+        """
+        n = doc.page_count
+        # Varios rangos por worker para equilibrar páginas caras (tablas) y baratas
+        n_ranges = min(n, self.workers * 4)
+        step = -(-n // n_ranges)
+        ranges = [(doc.name, start, min(start + step, n)) for start in range(0, n, step)]
+
+        t0 = time.perf_counter()
+        futures = [self._get_pool().submit(_parse_page_range, r) for r in ranges]
+        # Fin del parseo = cuándo terminó el último rango, no cuándo acabó el
+        # hook (visión), para que parse_s sea comparable con el modo serial
+        done_at = []
+        for f in futures:
+            f.add_done_callback(lambda _f: done_at.append(time.perf_counter()))
+        pages = []
+        for (_, start, _), f in zip(ranges, futures):
+            chunk = f.result()
+            if page_hook:
+                for offset, data in enumerate(chunk):
+                    page_hook(start + offset, doc[start + offset], data)
+            pages.extend(chunk)
+        self._record_stats(len(pages), max(done_at) - t0, workers=self.workers)
+        return pages
+
+    def _get_pool(self):
+        # spawn: el proceso padre puede tener hilos/CUDA cargados (fork no es seguro)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _record_stats(self, n, parse_s, workers):
+        self.last_stats = {
+            "pages": n,
+            "workers": workers,
+            "parse_s": round(parse_s, 4),
+            "ms_per_page": round(1000 * parse_s / n, 2) if n else 0.0
+        }
+
+    def _extract_page(self, page):
+        """
+        Extrae todo lo necesario de una página en una pasada: el dict de texto
+        (una sola llamada a get_text), estadísticas de fuente y tablas.
+        Devuelve el texto visual con sus headers y el texto plano de respaldo.
+        """
+        tables_md, rects = self._extract_tables_md(page)
+        try:
+            # Sin bloques de imagen: no se usan y copiarían los bytes de cada imagen
+            blocks = page.get_text("dict", flags=_TEXT_FLAGS)["blocks"]
+        except Exception:
+            blocks = []
+        avg_size = self._get_page_stats(blocks)
+        content, headers = self._extract_page_content_visual(blocks, tables_md, rects, avg_size)
+        return {
+            "content": content,
+            "headers": headers,
+            "plain": self._extract_page_content(blocks, tables_md, rects)
+        }
+
     # --- ESTRATEGIA SIMPLE (Respaldo) ---
-    def _process_simple(self, doc):
+    def _process_simple(self, pages):
         chunks = []
-        for i, page in enumerate(doc):
-            text = self._extract_page_content(page)
+        for i, page in enumerate(pages):
+            text = page["plain"]
             if len(text.strip()) > 50:
-                chunks.append(self._package(f"Página {i+1}", text))
+                chunks.append(self._package(f"Página {i+1}", text, i + 1, i + 1))
         return chunks
 
     # --- ESTRATEGIA ESTRUCTURADA (Headers por tamaño de fuente) ---
-    def _process_visual_structure(self, doc):
-        chunks = []
+    def _process_visual_structure(self, pages):
+        return list(self._stitch_sections(pages))
+
+    def _stitch_sections(self, pages):
+        """Genera las secciones a medida que se cierran (un header nuevo cierra la anterior)."""
         current_title = "INTRODUCCION"
-        buffer_text = ""
+        buffer_parts = []
+        start_page = 1
+        page_num = 0
         
-        for page in doc:
-            # Calculamos tamaño promedio de letra para detectar títulos
-            avg_size = self._get_page_stats(page)
-            page_content, headers = self._extract_page_content_visual(page, avg_size)
+        for page_num, page in enumerate(pages, start=1):
+            page_content, headers = page["content"], page["headers"]
             
             # Si hay headers nuevos, cortamos el chunk anterior
             if headers:
                 # Guardar lo que llevábamos
+                buffer_text = "".join(buffer_parts)
                 if buffer_text.strip():
-                    chunks.append(self._package(current_title, buffer_text))
+                    yield self._package(current_title, buffer_text, start_page, page_num - 1)
                 
                 # Iniciar nuevo bloque con el último header encontrado
                 current_title = headers[-1]
-                buffer_text = page_content
+                buffer_parts = [page_content]
+                start_page = page_num
             else:
                 # Si no hay headers, seguimos acumulando en la sección actual
-                buffer_text += page_content
+                buffer_parts.append(page_content)
                 
         # Guardar el último remanente
+        buffer_text = "".join(buffer_parts)
         if buffer_text.strip():
-            chunks.append(self._package(current_title, buffer_text))
-            
-        return chunks
+            yield self._package(current_title, buffer_text, start_page, page_num)
+
+    # --- MODO STREAMING ---
+    def iter_sections(self, doc, page_hook=None):
+        """
+        Versión generadora de process(): extrae página a página y entrega cada
+        sección apenas se cierra, sin retener el documento completo en memoria.
+        Solo guarda el texto plano de respaldo mientras no se haya emitido nada.
+        """
+        plain_pages = []
+        emitted = False
+        parse_s = 0.0
+
+        def _pages():
+            nonlocal parse_s
+            for page_num, page in enumerate(doc):
+                t0 = time.perf_counter()
+                data = self._extract_page(page)
+                parse_s += time.perf_counter() - t0
+                if not emitted:
+                    plain_pages.append({"plain": data["plain"]})
+                if page_hook: page_hook(page_num, page, data)
+                yield data
+
+        for section in self._stitch_sections(_pages()):
+            emitted = True
+            plain_pages.clear()
+            yield section
+
+        if not emitted:
+            yield from self._process_simple(plain_pages)
+        self._record_stats(doc.page_count, parse_s, workers=1)
 
     # --- UTILIDADES DE EXTRACCIÓN ---
-    def _extract_page_content(self, page):
+    def _extract_page_content(self, blocks, tables_md, rects):
         """Extrae texto plano respetando tablas"""
-        tables_md, rects = self._extract_tables_md(page)
-        text = tables_md + "\n"
-        blocks = page.get_text("dict")["blocks"]
+        parts = [tables_md, "\n"]
         for b in blocks:
             if "lines" in b and not self._is_inside_table(b["bbox"], rects):
                 for l in b["lines"]:
                     for s in l["spans"]:
-                        text += s["text"] + " "
-        return self._clean_text(text)
+                        parts.append(s["text"])
+                        parts.append(" ")
+        return self._clean_text("".join(parts))
 
-    def _extract_page_content_visual(self, page, avg_size):
+    def _extract_page_content_visual(self, blocks, tables_md, rects, avg_size):
         """Extrae texto e identifica headers basados en tamaño/negrita"""
-        tables_md, rects = self._extract_tables_md(page)
-        content = tables_md + "\n"
+        parts = [tables_md, "\n"]
         detected_headers = []
         
-        blocks = page.get_text("dict")["blocks"]
         for b in blocks:
             if "lines" in b and not self._is_inside_table(b["bbox"], rects):
                 for l in b["lines"]:
@@ -98,21 +259,22 @@ class PDFResilientParser:
                         
                         if self._is_header(s, avg_size, txt):
                             detected_headers.append(txt)
-                            content += f"\n=== {txt} ===\n"
+                            parts.append(f"\n=== {txt} ===\n")
                         else:
-                            content += txt + " "
-        return self._clean_text(content), detected_headers
+                            parts.append(txt)
+                            parts.append(" ")
+        return self._clean_text("".join(parts)), detected_headers
 
     def _extract_tables_md(self, page):
         """Detecta tablas y las convierte a Markdown"""
         tables = page.find_tables()
-        text_md = ""
+        parts = []
         rects = []
         if tables:
             for tab in tables:
-                text_md += f"\n[TABLA DETECTADA]:\n{tab.to_markdown()}\n"
+                parts.append(f"\n[TABLA DETECTADA]:\n{tab.to_markdown()}\n")
                 rects.append(tab.bbox)
-        return text_md, rects
+        return "".join(parts), rects
 
     def _is_inside_table(self, bbox, table_rects):
         for r in table_rects:
@@ -121,9 +283,9 @@ class PDFResilientParser:
                 return True
         return False
 
-    def _get_page_stats(self, page):
+    def _get_page_stats(self, blocks):
         try:
-            sizes = [s["size"] for b in page.get_text("dict")["blocks"] if "lines" in b for l in b["lines"] for s in l["spans"]]
+            sizes = [s["size"] for b in blocks if "lines" in b for l in b["lines"] for s in l["spans"]]
             return np.mean(sizes) if sizes else 10.0
         except:
             return 10.0
@@ -141,7 +303,7 @@ class PDFResilientParser:
     def _clean_text(self, text):
         return re.sub(r'\s+', ' ', text).strip()
 
-    def _package(self, title, text):
+    def _package(self, title, text, page_start=None, page_end=None):
         cat = "GENERAL"
         t_upper = (title + text[:200]).upper()
         
@@ -150,4 +312,4 @@ class PDFResilientParser:
         elif any(x in t_upper for x in ["TECNIC", "ESPECIFICACION", "ALCANCE", "MEMORIA"]): cat = "TECNICO"
         elif "EXPERIENCIA" in t_upper or "CONTRATOS" in t_upper: cat = "EXPERIENCIA"
             
-        return {"title": title, "text": text, "category": cat}
\ No newline at end of file
+        return {"title": title, "text": text, "category": cat, "page_start": page_start, "page_end": page_end}
\ No newline at end of file
@@ -0,0 +1,38 @@
+import os
+from PIL import Image
+
+# Resolución de entrada del modelo de visión (Florence-2 redimensiona a 768x768)
+VISION_INPUT_SIZE = int(os.getenv("VISION_INPUT_SIZE", "768"))
+# Margen sobre la resolución del modelo: el processor reduce en vez de ampliar
+RASTER_OVERSAMPLE = float(os.getenv("RASTER_OVERSAMPLE", "1.5"))
+RASTER_MIN_DPI = int(os.getenv("RASTER_MIN_DPI", "72"))
+RASTER_MAX_DPI = int(os.getenv("RASTER_MAX_DPI", "150"))
+
+
+def adaptive_dpi(page, input_size=VISION_INPUT_SIZE, oversample=RASTER_OVERSAMPLE,
+                 min_dpi=RASTER_MIN_DPI, max_dpi=RASTER_MAX_DPI):
+    """
+    DPI con el que el lado largo de la página queda en ~input_size*oversample
+    píxeles. Renderizar más es trabajo que el processor descarta al
+    redimensionar (una carta a 150 dpi son 1275x1650 para acabar en 768x768).
+    """
+    long_pt = max(page.rect.width, page.rect.height)  # puntos = 1/72 pulgada
+    if long_pt <= 0: return max_dpi
+    dpi = 72.0 * input_size * oversample / long_pt
+    return int(min(max_dpi, max(min_dpi, dpi)))
+
+
+def render_page(page, dpi=None):
+    """Pixmap RGB sin alfa de la página (PyMuPDF: llamar siempre desde el hilo dueño del documento)."""
+    return page.get_pixmap(dpi=dpi or adaptive_dpi(page), alpha=False)
+
+
+def pixmap_to_image(pix):
+    """
+    PIL.Image directamente sobre los samples del pixmap: sin codificar a PNG
+    ni volver a decodificar. `pix.samples` ya es una copia propia (bytes), así
+    que la imagen sigue siendo válida después de liberar el pixmap.
+    """
+    mode = {1: "L", 3: "RGB", 4: "RGBA"}[pix.n]
+    image = Image.frombuffer(mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride, 1)
+    return image if mode == "RGB" else image.convert("RGB")
@@ -138,19 +138,25 @@ def _check_financiero(requisitos_lic, indicadores_emp):
     for req in requisitos_lic:
         concepto = req['concepto'] # Ej: "Indice de Liquidez"
         operador = req['operador']
-        valor_req = float(req['valor_requerido'])
+        try:
+            valor_req = float(req['valor_requerido'])
+        except (TypeError, ValueError):
+            continue  # Umbral no numérico (ej: "Cumple"): no se puede comparar
         
         # Buscamos el valor en la empresa (normalizando claves si es necesario)
         # Asumimos que indicadores_emp tiene claves similares
         val_emp = indicadores_emp.get(concepto, 0)
         
         cumple_local = True
-        if operador == '>=':
-            cumple_local = val_emp >= valor_req
-        elif operador == '<=':
-            cumple_local = val_emp <= valor_req
-        elif operador == '=':
-            cumple_local = val_emp == valor_req
+        try:
+            if operador == '>=':
+                cumple_local = val_emp >= valor_req
+            elif operador == '<=':
+                cumple_local = val_emp <= valor_req
+            elif operador == '=':
+                cumple_local = val_emp == valor_req
+        except TypeError:
+            cumple_local = False  # Indicador no numérico en la empresa
             
         if not cumple_local:
             cumple_todo = False
@@ -0,0 +1,145 @@
+import numpy as np
+from scipy import sparse
+
+from api.core.financial_rules import FinancialRules
+
+# Mismos pesos que calcular_match_total
+W_SEM = 0.4
+W_TAX = 0.4
+W_FIN = 0.2
+
+
+def _requisitos_financieros(licitacion):
+    return (licitacion.get('metadatos_json') or {}).get('requisitos_habilitantes', {}).get('financiero', [])
+
+
+class MatchIndex:
+    """
+    Versión en lote de calcular_match_total: puntúa una empresa contra todas
+    las licitaciones a la vez.
+
+    - Vectores de objeto en una matriz float32 contigua y normalizada (N x D):
+      el coseno contra el perfil es un único producto matriz-vector.
+    - Códigos UNSPSC como matriz dispersa binaria (N x V): las coincidencias
+      salen de otro producto disperso, sin sets de Python por licitación.
+    - Requisitos financieros compilados a arrays (FinancialRules): se evalúan
+      para todas las licitaciones en una pasada de NumPy.
+
+    Devuelve el top-K con el mismo score y las mismas alertas que la versión
+    unitaria.
+    """
+
+    def __init__(self, ids, vectors, codes, financieros):
+        self.ids = list(ids)
+        self.vectors = vectors
+        self.codes = codes
+        self.n_codes = np.asarray(codes.getnnz(axis=1), dtype=np.float32)
+        self.rules = FinancialRules(financieros)
+
+    @classmethod
+    def from_rows(cls, licitaciones, dim=None):
+        """
+        Construye el índice desde dicts con 'id', 'objeto_vec', 'codigos_unspsc'
+        y 'metadatos_json' (el mismo formato que recibe calcular_match_total).
+        """
+        licitaciones = list(licitaciones)
+        if dim is None:
+            dim = next((len(l['objeto_vec']) for l in licitaciones if l.get('objeto_vec') is not None), 0)
+
+        vectors = np.zeros((len(licitaciones), dim), dtype=np.float32)
+        vocab = {}
+        rows, cols = [], []
+        financieros = []
+        for i, lic in enumerate(licitaciones):
+            if lic.get('objeto_vec') is not None:
+                vectors[i] = np.asarray(lic['objeto_vec'], dtype=np.float32)
+            for code in set(lic.get('codigos_unspsc') or []):
+                rows.append(i)
+                cols.append(vocab.setdefault(code, len(vocab)))
+            financieros.append(_requisitos_financieros(lic))
+
+        codes = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(licitaciones), max(len(vocab), 1))
+        )
+        index = cls([l.get('id') for l in licitaciones], _normalize_rows(vectors), codes, financieros)
+        index.vocab = vocab
+        return index
+
+    def score_all(self, empresa_perfil, semantico=None):
+        """
+        Componentes y score final (0-100) de todas las licitaciones, como arrays.
+        `semantico` permite pasar el coseno ya calculado (p.ej. por pgvector).
+        """
+        n = len(self.ids)
+
+        # 1. Financiero (hard constraint)
+        cumple, fallas = self.rules.evaluate(empresa_perfil.get('indicadores', {}))
+
+        # 2. Semántico: coseno = producto con filas ya normalizadas
+        if semantico is None and n == 0:
+            # Índice vacío: la matriz es (0, 0) y no admite el producto con el perfil
+            score_sem = np.zeros(0, dtype=np.float32)
+        elif semantico is None:
+            perfil = _normalize_rows(np.asarray(empresa_perfil['perfil_vec'], dtype=np.float32).reshape(1, -1))[0]
+            score_sem = self.vectors @ perfil
+        else:
+            score_sem = np.asarray(semantico, dtype=np.float32)
+
+        # 3. Taxonómico: |lic ∩ emp| / |lic|, 0.5 si la licitación no trae códigos
+        q = np.zeros(self.codes.shape[1], dtype=np.float32)
+        cols = [self.vocab[c] for c in set(empresa_perfil.get('codigos_unspsc', [])) if c in self.vocab]
+        q[cols] = 1.0
+        coincidencias = self.codes @ q
+        score_tax = np.full(n, 0.5, dtype=np.float32)
+        con_codigos = self.n_codes > 0
+        score_tax[con_codigos] = coincidencias[con_codigos] / self.n_codes[con_codigos]
+
+        final = (score_sem * W_SEM) + (score_tax * W_TAX) + (1.0 * W_FIN)
+        final = np.where(cumple, np.round(final.astype(np.float64) * 100, 2), 0.0)
+        return {"score": final, "semantico": score_sem, "taxonomico": score_tax,
+                "cumple_financiero": cumple, "fallas": fallas}
+
+    def top_k(self, empresa_perfil, k=20, semantico=None):
+        """Las K mejores licitaciones para la empresa, con score, componentes y alertas."""
+        if not self.ids: return []
+        comp = self.score_all(empresa_perfil, semantico)
+        return self._rank(comp, np.arange(len(self.ids)), empresa_perfil, k)
+
+    def _rank(self, comp, candidates, empresa_perfil, k):
+        scores = comp["score"][candidates]
+        k = min(k, len(candidates))
+        if k == 0: return []
+
+        # argpartition para no ordenar N; desempate estable por posición
+        if k < len(candidates):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((top, -scores[top]))]
+
+        indicadores = empresa_perfil.get('indicadores', {})
+        resultados = []
+        for j in top:
+            i = candidates[j]
+            # Las alertas solo se arman para lo que se devuelve
+            alertas = self.rules.alertas(i, indicadores, comp["fallas"])
+            if comp["cumple_financiero"][i]:
+                alertas = alertas + ["Habilitado"]
+            else:
+                alertas = alertas + ["Descalificado por Financiero"]
+            resultados.append({
+                "licitacion_id": self.ids[i],
+                "score": float(comp["score"][i]),
+                "semantico": float(comp["semantico"][i]),
+                "taxonomico": float(comp["taxonomico"][i]),
+                "alertas": alertas
+            })
+        return resultados
+
+
+def _normalize_rows(m):
+    """Normaliza filas a norma 1; las filas nulas quedan en cero (coseno 0, como sklearn)."""
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(m / norms, dtype=np.float32)
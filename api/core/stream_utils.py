@@ -0,0 +1,106 @@
+import os
+import queue
+import threading
+
+# Marcador de fin de stream entre etapas
+FIN = object()
+
+
+class Aborted(Exception):
+    """Otra etapa falló: las demás dejan de esperar en sus colas."""
+
+
+def current_rss_mb():
+    """RSS actual del proceso en MB (Linux: /proc/self/statm; si no, el pico de getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssMonitor(threading.Thread):
+    """Muestrea el RSS en segundo plano y guarda el pico observado durante un documento."""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.start_mb = current_rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+        return self.peak_mb
+
+
+class StreamStages:
+    """
+    Hilos de etapa unidos por colas acotadas. Si una etapa lanza una excepción
+    se activa `abort`, el resto sale de sus put/get y join() la relanza.
+    """
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self.abort = threading.Event()
+        self.errors = []
+        self._threads = []
+        self._queues = []
+
+    def queue(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        self._queues.append(q)
+        return q
+
+    def put(self, q, item):
+        while True:
+            if self.abort.is_set(): raise Aborted()
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, q):
+        while True:
+            if self.abort.is_set(): raise Aborted()
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def drained(self):
+        return all(q.empty() for q in self._queues)
+
+    def spawn(self, target, *args):
+        def _run():
+            try:
+                target(*args)
+            except Aborted:
+                pass
+            except Exception as e:
+                self.errors.append(e)
+                self.abort.set()
+
+        t = threading.Thread(target=_run, daemon=True)
+        t.start()
+        self._threads.append(t)
+        return t
+
+    def fail(self, error):
+        self.errors.append(error)
+        self.abort.set()
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+        if self.errors:
+            raise self.errors[0]
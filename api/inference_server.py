@@ -0,0 +1,117 @@
+"""
+Servidor de inferencia compartido: un solo proceso tiene los pesos de
+Florence-2 y del embedder y atiende a todos los workers de API/ingesta de la
+máquina (INFERENCE_SERVER_URL en ellos). Así los workers escalan sin copiar
+los modelos en cada uno.
+
+Uso:
+    python -m api.inference_server --uds /tmp/licita-inference.sock
+    python -m api.inference_server --host 127.0.0.1 --port 8100
+"""
+import os
+import json
+import threading
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+from PIL import Image
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from api.core.model_registry import registry, get_model
+
+# Modelos a cargar al arrancar el servidor
+INFERENCE_WARMUP = [m.strip() for m in os.getenv("INFERENCE_WARMUP", "embedder,florence").split(",") if m.strip()]
+
+app = FastAPI(title="Licitaciones Inference")
+
+# Un forward a la vez por modelo: peticiones concurrentes de varios workers
+# no multiplican la memoria de activaciones (cada una ya viene en lote)
+_model_locks = {"embedder": threading.Lock(), "florence": threading.Lock()}
+
+
+class EmbedRequest(BaseModel):
+    texts: list[str]
+    batch_size: int = 64
+
+
+@app.on_event("startup")
+def warmup_models():
+    registry.warmup(INFERENCE_WARMUP)
+
+
+@app.get("/health")
+def health():
+    ready = registry.ready(INFERENCE_WARMUP)
+    return {"status": "ready" if ready else "loading", "models": registry.status()}
+
+
+@app.post("/embed")
+def embed(req: EmbedRequest):
+    embedder = get_model("embedder")
+    with _model_locks["embedder"]:
+        vecs = embedder.encode(req.texts, batch_size=req.batch_size, convert_to_numpy=True, show_progress_bar=False)
+    vecs = np.ascontiguousarray(vecs, dtype=np.float32).reshape(len(req.texts), -1)
+    return Response(content=vecs.tobytes(), media_type="application/octet-stream",
+                    headers={"X-Shape": f"{vecs.shape[0]},{vecs.shape[1]}"})
+
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    # El bloque es del cliente (él hace unlink): que el resource tracker de
+    # este proceso no lo borre ni avise al salir
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _caption(meta, body):
+    from api.core.modelo_pixel.ai_engine import analizar_imagenes_con_florence
+
+    shm = _attach(meta["shm"]) if meta.get("shm") else None
+    buf = shm.buf if shm is not None else memoryview(body)
+    try:
+        # Image.frombuffer no copia: las imágenes apuntan a la memoria compartida
+        images = {}
+        for i, item in enumerate(meta["images"]):
+            w, h, off = item["width"], item["height"], item["offset"]
+            images[i] = Image.frombuffer("RGB", (w, h), buf[off:off + w * h * 3], "raw", "RGB", 0, 1)
+        parciales = set()
+        with _model_locks["florence"]:
+            salida = analizar_imagenes_con_florence(images, task_prompt=meta["task_prompt"],
+                                                    text_input=meta.get("text_input"), parciales=parciales)
+        return {"resultados": [salida.get(i, "") for i in range(len(meta["images"]))],
+                "parciales": sorted(parciales)}
+    finally:
+        images = None
+        del buf
+        if shm is not None:
+            shm.close()
+
+
+@app.post("/caption")
+async def caption(request: Request):
+    try:
+        meta = json.loads(request.headers["X-Inference-Meta"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Falta X-Inference-Meta")
+    body = b"" if meta.get("shm") else await request.body()
+    return await run_in_threadpool(_caption, meta, body)
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description="Servidor de inferencia compartido")
+    ap.add_argument("--uds", default=None, help="Socket Unix (recomendado en la misma máquina)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8100)
+    args = ap.parse_args()
+
+    # Un único proceso: es el que tiene los modelos
+    if args.uds:
+        uvicorn.run(app, uds=args.uds, workers=1)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, workers=1)
@@ -1,88 +1,260 @@
 import os
+import gc
 import json
-import io
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import fitz  # PyMuPDF
-from PIL import Image
 
 # --- IMPORTACIONES ---
 from google import genai
 from google.genai import types
-from sentence_transformers import SentenceTransformer
 from api.core.pdf_utils import PDFResilientParser
-from database.connection import get_db_connection
-from api.core.modelo_pixel.ai_engine import analizar_imagen_con_florence
+from database.connection import db_connection, get_pool
+from database.bulk import write_document_sections
+from database.jobs import LeaseLost
+from api.core.modelo_pixel.ai_engine import analizar_imagenes_con_florence, model_tag as FLORENCE_MODEL_TAG
+from api.core.modelo_pixel import vision_cache
+from api.core.modelo_pixel.vision_cache import get_vision_cache, page_cache_key
+from api.core.llm_concurrency import TokenBucket, call_with_backoff, map_bounded
+from api.core.llm_cache import get_llm_cache
+from api.core.stream_utils import FIN, Aborted, RssMonitor, StreamStages, current_rss_mb
+from api.core.page_triage import TriagePolicy, triage_page, new_triage_report, record
+from api.core.raster import render_page, pixmap_to_image
+from api.core.model_registry import get_model
+from api.core.inference_client import get_inference_client, RemoteEmbedder
+from api.core.chunker import TokenChunker, EMBED_WINDOW_TOKENS, EMBED_WINDOW_OVERLAP, LLM_WINDOW_TOKENS, LLM_WINDOW_OVERLAP
 
-class TenderPipeline:
-    def __init__(self):
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            print(" WARNING: GOOGLE_API_KEY not found.")
-            self.client = None
-        else:
-            try:
-                self.client = genai.Client(api_key=api_key)
-                print(" Using Google GenAI Client (Default/Beta).")
-            except Exception as e:
-                print(f" Error init Gemini: {e}")
-                self.client = None
-        
-        self.model_name = "gemini-2.5-flash" 
+# Modo del pipeline: 'batch' (todo en memoria, una transacción) o 'streaming'
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "batch")
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+PIPELINE_MAX_RSS_MB = float(os.getenv("PIPELINE_MAX_RSS_MB", "0"))  # 0 = sin techo
+
+# Tamaño de lote para el embedder (un forward pass por lote en vez de uno por texto)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Gemini: concurrencia y rate limit de la extracción por sección
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")  # p.ej. stub local para pruebas
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_RPS = float(os.getenv("GEMINI_RPS", "4"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "8"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+
+# Tarea Florence aplicada a cada página
+VISION_TASK = "<MORE_DETAILED_CAPTION>"
+# Páginas acumuladas antes de lanzar un lote a Florence (el motor lo subdivide según memoria)
+VISION_BATCH_SIZE = int(os.getenv("VISION_BATCH_SIZE", "8"))
+
+# Versiones de las plantillas de prompt: cambiarlas invalida la caché LLM
+TAXONOMY_PROMPT_VERSION = "taxonomy-v1"
+EXTRACTION_PROMPT_VERSION = "extraction-v1"
+
+# Categorías que pasan por extracción de requisitos con Gemini
+CATEGORIAS_EXTRACCION = ["FINANCIERO", "JURIDICO", "EXPERIENCIA", "TECNICO"]
+
+class PageVisionStage:
+    """
+    Etapa de visión (Florence-2) alimentada página a página desde la pasada
+    única de PDFResilientParser: triage, render, caché por página y lotes.
 
-        print(" Loading embedding model (all-mpnet-base-v2)...")
+    El render se queda en el hilo del parser (PyMuPDF no es thread-safe) y la
+    inferencia de cada lote corre en un hilo aparte: mientras Florence procesa
+    un lote, el parser ya extrae y renderiza las páginas siguientes. Como mucho
+    hay un lote en curso y otro acumulándose.
+    """
+
+    def __init__(self, pipeline):
+        self.triage_policy = pipeline.triage_policy
+        self.cache = pipeline.vision_cache
+        self.stats = {"pages": 0, "hits": 0, "misses": 0, "stored": 0}
+        self.triage = new_triage_report(self.triage_policy)
+        self.resultados = {}   # page_num -> descripción
+        self.pendientes = []   # (page_num, imagen, clave_cache) a inferir en lote
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vision")
+        self._en_curso = None  # (future, páginas del lote)
+        # Florence local o en el servidor de inferencia compartido
+        self.analizar = pipeline.inference.analizar_imagenes if pipeline.inference else analizar_imagenes_con_florence
+
+    def on_page(self, page_num, page, page_data=None):
+        try:
+            # Triage barato (sin render ni otra extracción de texto): texto puro no gana nada con un caption
+            n_chars = len(page_data["plain"]) if page_data else None
+            needs_vision, reason = triage_page(page, self.triage_policy, n_chars)
+            record(self.triage, needs_vision, reason)
+            if not needs_vision: return
+
+            self.stats["pages"] += 1
+            # DPI según el tamaño de la página y la resolución de entrada del modelo
+            pix = render_page(page)
+
+            key = page_cache_key(self.cache, pix, VISION_TASK, FLORENCE_MODEL_TAG) if self.cache else None
+            if key:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.resultados[page_num] = vision_cache.loads(cached)
+                    self.stats["hits"] += 1
+                    return
+
+            self.stats["misses"] += 1
+            # Imagen RGB directa desde los samples, sin ida y vuelta por PNG
+            self.pendientes.append((page_num, pixmap_to_image(pix), key))
+            del pix
+
+            # Acumulamos páginas y las inferimos en un solo generate()
+            if len(self.pendientes) >= VISION_BATCH_SIZE:
+                self._flush()
+            
+        except Exception as e_vision:
+            print(f"  Error visión en página {page_num}: {e_vision}")
+
+    def _flush(self):
+        """Lanza el lote acumulado a inferencia en segundo plano."""
+        if not self.pendientes: return
+        self._wait()
+        lote, self.pendientes = self.pendientes, []
+        self._en_curso = (self._executor.submit(self._infer, lote), {page_num for page_num, _, _ in lote})
+
+    def _infer(self, lote):
+        parciales = set()
         try:
-            self.embedder = SentenceTransformer('all-mpnet-base-v2', device='cpu')
-            self.embedder.encode("warmup")
-            print(" Embeddings cargados y listos.")
+            salida = self.analizar(
+                {page_num: image for page_num, image, _ in lote}, task_prompt=VISION_TASK, parciales=parciales
+            )
         except Exception as e:
-            print(f" Error crítico en Embeddings: {e}")
-            raise e
-        
+            print(f"  Error visión en lote {[p for p, _, _ in lote]}: {e}")
+            salida = {}
+        return lote, salida, parciales
+
+    def _wait(self):
+        """Espera el lote en curso y guarda sus resultados (en el hilo del pipeline)."""
+        if self._en_curso is None: return
+        future, _ = self._en_curso
+        self._en_curso = None
+        lote, salida, parciales = future.result()
+        for page_num, _, key in lote:
+            descripcion = salida.get(page_num, "")
+            self.resultados[page_num] = descripcion
+            # Una salida cortada por el plazo depende de la carga del momento: no se cachea
+            if key and page_num not in parciales and vision_cache.is_cacheable(descripcion):
+                self.cache.set(key, vision_cache.dumps(descripcion))
+                self.stats["stored"] += 1
+
+    def collect(self, page_start, page_end):
+        """
+        Modo streaming: captions de las páginas [page_start, page_end] (1-based),
+        liberándolas de memoria. Infiere antes lo pendiente de ese rango.
+        """
+        if any(page_num < page_end for page_num, _, _ in self.pendientes):
+            self._flush()
+        if self._en_curso and min(self._en_curso[1]) < page_end:
+            self._wait()
+        out = {}
+        for page_num in range(page_start - 1, page_end):
+            if page_num in self.resultados:
+                out[f"page_{page_num + 1}"] = self.resultados.pop(page_num)
+        return out
+
+    def close(self):
+        """
+        Libera el hilo de visión y las imágenes pendientes si el pipeline falla
+        antes de finish(). Un lote ya en Florence no se puede interrumpir:
+        termina y el hilo sale; lo que aún no empezó se cancela.
+        """
+        self.pendientes = []
+        self._en_curso = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def finish(self):
+        """Devuelve (visual_metadata, contexto_visual_global, stats de caché, reporte de triage)."""
+        self._flush()
+        self._wait()
+        self._executor.shutdown()
+
+        # Guardar en orden de página
+        visual_metadata = {}
+        contexto_parts = []
+        for page_num in sorted(self.resultados):
+            descripcion = self.resultados[page_num]
+            visual_metadata[f"page_{page_num + 1}"] = descripcion
+            contexto_parts.append(f"[Página {page_num+1} Análisis Visual]: {descripcion}\n")
+
+        triage = self.triage
+        print(f"  Análisis visual completado en {self.stats['pages']} páginas "
+              f"(triage '{triage['policy']}': {triage['skipped']}/{triage['pages']} omitidas; "
+              f"caché: {self.stats['hits']} hits / {self.stats['misses']} misses).")
+        return visual_metadata, "".join(contexto_parts), self.stats, triage
+
+
+class TenderPipeline:
+    def __init__(self):
+        self._init_gemini()
+
+        # Los modelos (embedder, Florence) se cargan en el primer uso vía el registro,
+        # salvo con INFERENCE_SERVER_URL: entonces viven en el servidor de inferencia
+        self.inference = get_inference_client()
+        self._remote_embedder = RemoteEmbedder(self.inference) if self.inference else None
+        self.embed_batch_size = EMBED_BATCH_SIZE
+        self._chunkers = None
+        self.vision_cache = get_vision_cache()
+        self.triage_policy = TriagePolicy.from_env()
         self.parser = PDFResilientParser()
 
-    def process_pdf(self, pdf_path: str, lic_id_interno: str):
+    @property
+    def embedder(self):
+        return self._remote_embedder or get_model("embedder")
+
+    @property
+    def embed_chunker(self):
+        return self._get_chunkers()[0]
+
+    @property
+    def llm_chunker(self):
+        return self._get_chunkers()[1]
+
+    def _get_chunkers(self):
+        # Ventanas por tokens sobre las secciones: una para el embedder y otra para los prompts
+        if self._chunkers is None:
+            tokenizer = getattr(self.embedder, "tokenizer", None)
+            self._chunkers = (
+                TokenChunker(EMBED_WINDOW_TOKENS, EMBED_WINDOW_OVERLAP, tokenizer=tokenizer),
+                TokenChunker(LLM_WINDOW_TOKENS, LLM_WINDOW_OVERLAP, tokenizer=tokenizer)
+            )
+        return self._chunkers
+
+    def process_pdf(self, pdf_path: str, lic_id_interno: str, lease=None):
+        """
+        `lease` (opcional, lo pasa el worker): check() entre etapas y
+        fence(cur) dentro de cada transacción que escribe. Si el job pasó a
+        otro worker lanzan LeaseLost y no se persiste nada más.
+        """
+        if PIPELINE_MODE == "streaming":
+            return self.process_pdf_streaming(pdf_path, lic_id_interno, lease=lease)
+
         print(f"\nSTARTING PIPELINE: {lic_id_interno} | File: {pdf_path}")
 
         # ---------------------------------------------------------
-        # PASO 0: VISIÓN COMPUTACIONAL (Florence-2)
+        # PASO 0+1: PARSING DE TEXTO + VISIÓN (Florence-2) EN UNA PASADA
         # ---------------------------------------------------------
-        print(" Ejecutando análisis visual (Florence-2)...")
-        visual_metadata = {}
-        contexto_visual_global = ""
-        
+        # El documento se abre una sola vez: el parser recorre cada página y
+        # la etapa de visión recibe la misma página vía page_hook.
         try:
             doc = fitz.open(pdf_path)
-            # Procesamos todas las páginas
-            for page_num, page in enumerate(doc):
-                try:
-                    pix = page.get_pixmap(dpi=150)
-                    img_data = pix.tobytes("png")
-                    
-                    # CORRECCIÓN DE VISIÓN: Convertir a RGB siempre
-                    # Esto arregla el error: 'NoneType' object has no attribute 'shape'
-                    image = Image.open(io.BytesIO(img_data)).convert("RGB")
-                    
-                    # Llamada a la GPU
-                    descripcion = analizar_imagen_con_florence(image)
-                    
-                    # Guardar
-                    page_key = f"page_{page_num + 1}"
-                    visual_metadata[page_key] = descripcion
-                    contexto_visual_global += f"[Página {page_num+1} Análisis Visual]: {descripcion}\n"
-                    
-                except Exception as e_vision:
-                    print(f"  Error visión en página {page_num}: {e_vision}")
-            
-            doc.close()
-            print(f"  Análisis visual completado en {len(visual_metadata)} páginas.")
-            
         except Exception as e:
-            print(f"Error crítico abriendo PDF para visión: {e}")
+            raise ValueError(f"No se pudo abrir {pdf_path}: {e}")
 
-        # ---------------------------------------------------------
-        # PASO 1: PARSING DE TEXTO
-        # ---------------------------------------------------------
-        chunks = self.parser.process(pdf_path, use_vision=False)
-        if isinstance(chunks, tuple): chunks = chunks[0]
+        print(" Ejecutando parsing + análisis visual (Florence-2)...")
+        vision = PageVisionStage(self)
+        try:
+            chunks = self.parser.process(doc, use_vision=False, page_hook=vision.on_page)
+            if isinstance(chunks, tuple): chunks = chunks[0]
+            visual_metadata, contexto_visual_global, vision_stats, triage_report = vision.finish()
+        finally:
+            vision.close()
+            doc.close()
+
+        if lease: lease.check()
+        parse_stats = self.parser.last_stats
+        print(f" Parsing: {parse_stats.get('pages', 0)} páginas, {parse_stats.get('ms_per_page', 0)} ms/página.")
 
         if not chunks:
             raise ValueError(f"No text extracted from {pdf_path}")
@@ -96,108 +268,486 @@ class TenderPipeline:
         
         taxonomy = self._infer_taxonomy_gemini(contexto_total)
         print(f" Taxonomy: {taxonomy.get('familia_principal', 'Unknown')}")
+        if lease: lease.check()
         
         # ---------------------------------------------------------
-        # PASO 3: GUARDADO EN BASE DE DATOS
+        # PASO 3: EXTRACCIÓN DE REQUISITOS (Gemini)
+        # ---------------------------------------------------------
+        # Se hace antes de abrir la transacción: así los conceptos quedan
+        # disponibles para vectorizarlos en lote junto con los chunks.
+        # Las secciones se envían en paralelo (concurrencia acotada + rate limit).
+        t0 = time.perf_counter()
+        extracted_by_chunk = self._extract_all_requirements(chunks, visual_metadata)
+        n_llm = sum(1 for c in chunks if c.get('category', 'GENERAL') in CATEGORIAS_EXTRACCION)
+        print(f" Extracción Gemini: {n_llm} secciones en {time.perf_counter() - t0:.2f}s")
+        if lease: lease.check()
+
+        # ---------------------------------------------------------
+        # PASO 4: EMBEDDINGS EN LOTE
+        # ---------------------------------------------------------
+        secciones = self._embed_sections(chunks, extracted_by_chunk)
+
         # ---------------------------------------------------------
-        conn = get_db_connection()
+        # PASO 5: GUARDADO EN BASE DE DATOS
+        # ---------------------------------------------------------
+        with db_connection() as conn:
+            try:
+                cur = conn.cursor()
+                # El lease queda bloqueado hasta el commit: nadie retoma el job a mitad de la escritura
+                if lease: lease.fence(cur)
+
+                # A. INSERT LICITACION
+                lic_db_id = self._insert_licitacion(cur, lic_id_interno, taxonomy)
+
+                # B. INSERT PDF
+                file_meta = {
+                    "size_bytes": os.path.getsize(pdf_path), 
+                    "page_count_est": len(chunks),
+                    "visual_content": visual_metadata,
+                    "vision_cache": vision_stats,
+                    "vision_triage": triage_report,
+                    "parse_stats": parse_stats
+                }
+                pdf_db_id = self._insert_pdf(cur, lic_db_id, pdf_path, file_meta)
+
+                # C. SECCIONES & VECTORES (escritura masiva, vectores precalculados)
+                t0 = time.perf_counter()
+                sec_ids, n_nodos = write_document_sections(cur, pdf_db_id, secciones)
+                print(f" DB: {len(sec_ids)} secciones y {n_nodos} nodos en {time.perf_counter() - t0:.2f}s")
+
+                cur.execute("UPDATE registro_licitaciones SET estado_actual = 'INDEXADO', version = version + 1 WHERE id = %s", (lic_db_id,))
+                conn.commit()
+                return {"status": "success", "licitacion_id": lic_db_id}
+
+            except Exception as e:
+                conn.rollback()
+                print(f"Error DB Transaction: {e}")
+                raise e
+
+    # ---------------------------------------------------------
+    # MODO STREAMING (memoria acotada)
+    # ---------------------------------------------------------
+    def process_pdf_streaming(self, pdf_path: str, lic_id_interno: str, lease=None):
+        """
+        Variante en streaming de process_pdf: las secciones fluyen
+        parser -> extracción (Gemini) -> embeddings -> DB por colas acotadas y
+        se persisten por lotes a medida que se cierran. Nada retiene el
+        documento completo; si el RSS supera PIPELINE_MAX_RSS_MB el parser
+        espera a que las etapas siguientes vacíen sus colas.
+        """
+        print(f"\nSTARTING STREAMING PIPELINE: {lic_id_interno} | File: {pdf_path}")
         try:
-            cur = conn.cursor()
-            
-            # A. INSERT LICITACION
+            doc = fitz.open(pdf_path)
+        except Exception as e:
+            raise ValueError(f"No se pudo abrir {pdf_path}: {e}")
+
+        rss = RssMonitor()
+        rss.start()
+        stages = StreamStages(PIPELINE_QUEUE_SIZE)
+        q_sections, q_embed, q_persist = stages.queue(), stages.queue(), stages.queue()
+        vision = PageVisionStage(self)
+        counters = {"sections": 0, "nodes": 0, "batches": 0}
+
+        # Conexión del pool retenida durante todo el documento (la etapa de persistencia usa otra)
+        conn = get_pool().getconn()
+        cur = conn.cursor()
+        lic_db_id = pdf_db_id = None
+        try:
+            # La fila de la licitación y del PDF se crean al inicio; la taxonomía llega al final
+            if lease: lease.fence(cur)
+            lic_db_id = self._insert_licitacion(cur, lic_id_interno, {})
+            pdf_db_id = self._insert_pdf(cur, lic_db_id, pdf_path, {
+                "size_bytes": os.path.getsize(pdf_path),
+                "visual_content": {}
+            })
+            conn.commit()
+
+            # Etapas consumidoras
+            n_extractors = max(1, self.llm_max_concurrency)
+            pending_extractors = [n_extractors]
+            extractor_lock = threading.Lock()
+            for _ in range(n_extractors):
+                stages.spawn(self._stream_extract, stages, q_sections, q_embed, pending_extractors, extractor_lock)
+            stages.spawn(self._stream_embed, stages, q_embed, q_persist)
+            stages.spawn(self._stream_persist, stages, q_persist, pdf_db_id, counters, lease)
+
+            # Productor: parser (+ visión por página) en este hilo
+            taxonomy_sample, visual_head = [], []
+            taxonomy_result = {}
+            taxonomy_thread = None
+            try:
+                for orden, sec in enumerate(self.parser.iter_sections(doc, page_hook=vision.on_page)):
+                    # Los extractores en paralelo las persisten desordenadas: se guarda su posición
+                    sec["orden"] = orden
+                    if lease: lease.check()
+                    self._wait_for_memory(stages, rss)
+                    sec["_visual"] = vision.collect(sec.get("page_start") or 1, sec.get("page_end") or 1)
+
+                    # Muestra acotada para la taxonomía (mismos límites que el modo batch)
+                    if len(taxonomy_sample) < 10:
+                        taxonomy_sample.append(sec.get('text', '')[:3000])
+                        for page_key, descripcion in sec["_visual"].items():
+                            visual_head.append(f"[Página {page_key[5:]} Análisis Visual]: {descripcion}\n")
+                        if len(taxonomy_sample) == 10:
+                            taxonomy_thread = self._start_taxonomy(taxonomy_sample, visual_head, taxonomy_result)
+
+                    stages.put(q_sections, sec)
+            except Aborted:
+                pass
+            except Exception as e:
+                stages.fail(e)
+            finally:
+                if not stages.abort.is_set():
+                    stages.put(q_sections, FIN)
+
+            if taxonomy_thread is None and taxonomy_sample and not stages.abort.is_set():
+                taxonomy_thread = self._start_taxonomy(taxonomy_sample, visual_head, taxonomy_result)
+
+            stages.join()
+            if taxonomy_thread: taxonomy_thread.join()
+            if counters["sections"] == 0:
+                raise ValueError(f"No text extracted from {pdf_path}")
+
+            visual_rest, _, vision_stats, triage_report = vision.finish()
+            taxonomy = taxonomy_result.get("taxonomy", {})
+            peak_mb = rss.stop()
+            print(f" Taxonomy: {taxonomy.get('familia_principal', 'Unknown')}")
+            print(f" Streaming: {counters['sections']} secciones, {counters['nodes']} nodos en "
+                  f"{counters['batches']} lotes | pico RSS {peak_mb:.0f} MB")
+
+            if lease: lease.fence(cur)
             cur.execute("""
-                INSERT INTO registro_licitaciones (codigo_proceso, entidad, estado_actual, metadata_global)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (codigo_proceso) DO UPDATE 
-                SET estado_actual = 'PROCESANDO',
-                    metadata_global = EXCLUDED.metadata_global
-                RETURNING id;
-            """, (
-                lic_id_interno, 
-                "Entidad Pendiente", 
-                "PROCESANDO", 
-                json.dumps(taxonomy)
-            ))
-            lic_db_id = cur.fetchone()[0]
-
-            # B. INSERT PDF
-            file_meta = {
-                "size_bytes": os.path.getsize(pdf_path), 
-                "page_count_est": len(chunks),
-                "visual_content": visual_metadata 
-            }
-            
+                UPDATE registro_pdfs
+                SET metadata_archivo = metadata_archivo || %s::jsonb
+                        || jsonb_build_object('visual_content', metadata_archivo->'visual_content' || %s::jsonb)
+                WHERE id = %s
+            """, (json.dumps({
+                "page_count_est": counters["sections"],
+                "vision_cache": vision_stats,
+                "vision_triage": triage_report,
+                "parse_stats": self.parser.last_stats,
+                "streaming": {"peak_rss_mb": round(peak_mb, 1), "start_rss_mb": round(rss.start_mb, 1),
+                              "max_rss_mb": PIPELINE_MAX_RSS_MB, "batches": counters["batches"]}
+            }), json.dumps(visual_rest), pdf_db_id))
             cur.execute("""
-                INSERT INTO registro_pdfs (licitacion_id, nombre_archivo, ruta_almacenamiento, metadata_archivo)
-                VALUES (%s, %s, %s, %s)
-                RETURNING id;
-            """, (lic_db_id, os.path.basename(pdf_path), pdf_path, json.dumps(file_meta)))
-            pdf_db_id = cur.fetchone()[0]
-
-            # C. SECCIONES & VECTORES
-            for chunk in chunks:
-                cat = chunk.get('category', 'GENERAL')
-                page_num = chunk.get('page', 1)
-                title = chunk.get('title', f"Página {page_num}")
-                text = chunk.get('text', '')
-
-                # Insertar Sección
-                cur.execute("""
-                    INSERT INTO secciones_documento (pdf_id, titulo_detectado, categoria_seccion, metadata_extracted)
-                    VALUES (%s, %s, %s, %s) RETURNING id;
-                """, (pdf_db_id, title, cat, '{}'))
-                sec_id = cur.fetchone()[0]
-
-                # Vectorizar Texto
-                text_vec = self.embedder.encode(text[:800]).tolist()
-                cur.execute("""
-                    INSERT INTO nodos_vectorizados (seccion_id, tipo_nodo, contenido_texto, embedding_vec)
-                    VALUES (%s, 'CHUNK_TEXTO', %s, %s)
-                """, (sec_id, text, text_vec))
-
-                # Extraer Requisitos
-                if cat in ["FINANCIERO", "JURIDICO", "EXPERIENCIA", "TECNICO"]:
-                    info_visual_pagina = visual_metadata.get(f"page_{page_num}", "")
-                    extracted = self._extract_requirements_gemini(text, cat, info_visual_pagina)
-                    
-                    if extracted:
-                        cur.execute("UPDATE secciones_documento SET metadata_extracted = %s WHERE id = %s", 
-                                    (json.dumps(extracted), sec_id))
-                        
-                        for key in ['juridico', 'financiero']:
-                            for item in extracted.get(key, []):
-                                self._insert_node(cur, sec_id, f'REQUISITO_{key.upper()}', item)
-                        
-                        exp = extracted.get('experiencia', {})
-                        if exp and 'filtros' in exp:
-                            for item in exp['filtros']:
-                                self._insert_node(cur, sec_id, 'REQUISITO_EXPERIENCIA', item)
-
-            cur.execute("UPDATE registro_licitaciones SET estado_actual = 'INDEXADO' WHERE id = %s", (lic_db_id,))
+                UPDATE registro_licitaciones SET estado_actual = 'INDEXADO', metadata_global = %s, version = version + 1
+                WHERE id = %s
+            """, (json.dumps(taxonomy), lic_db_id))
             conn.commit()
-            return {"status": "success", "licitacion_id": lic_db_id}
+            return {"status": "success", "licitacion_id": lic_db_id, "peak_rss_mb": round(peak_mb, 1)}
 
         except Exception as e:
+            stages.abort.set()
             conn.rollback()
-            print(f"Error DB Transaction: {e}")
+            print(f"Error Streaming Pipeline: {e}")
+            # Las secciones ya persistidas se descartan (CASCADE) para que un reintento no duplique.
+            # Sin lease la licitación ya es de otro worker: solo se borra el PDF propio.
+            if pdf_db_id is not None:
+                cur.execute("DELETE FROM registro_pdfs WHERE id = %s", (pdf_db_id,))
+                if not isinstance(e, LeaseLost):
+                    cur.execute("UPDATE registro_licitaciones SET estado_actual = 'ERROR', version = version + 1 WHERE id = %s", (lic_db_id,))
+                conn.commit()
             raise e
         finally:
-            conn.close()
+            if rss.is_alive(): rss.stop()
+            vision.close()
+            doc.close()
+            get_pool().putconn(conn, close=bool(conn.closed))
 
-    def _insert_node(self, cur, sec_id, node_type, item_dict):
-        concept = item_dict.get('concepto', 'N/A')
-        if not concept: concept = "Indefinido"
-        vec = self.embedder.encode(str(concept)[:500]).tolist()
+    def _wait_for_memory(self, stages, rss):
+        """Contrapresión: si el RSS supera el techo, esperamos a que las colas se vacíen."""
+        if not PIPELINE_MAX_RSS_MB or current_rss_mb() <= PIPELINE_MAX_RSS_MB: return
+        gc.collect()
+        while current_rss_mb() > PIPELINE_MAX_RSS_MB and not stages.drained():
+            if stages.abort.is_set(): raise Aborted()
+            time.sleep(0.1)
+
+    def _start_taxonomy(self, taxonomy_sample, visual_head, out):
+        resumen_texto = " ".join(taxonomy_sample)[:3000]
+        contexto_total = f"RESUMEN VISUAL:\n{''.join(visual_head)[:1500]}\n\nTEXTO INICIAL:\n{resumen_texto}"
+
+        def _run():
+            out["taxonomy"] = self._infer_taxonomy_gemini(contexto_total)
+
+        t = threading.Thread(target=_run, daemon=True)
+        t.start()
+        return t
+
+    def _stream_extract(self, stages, q_in, q_out, pending, lock):
+        while True:
+            sec = stages.get(q_in)
+            if sec is FIN:
+                # Reenviamos el fin a los hermanos; el último avisa a la etapa siguiente
+                stages.put(q_in, FIN)
+                with lock:
+                    pending[0] -= 1
+                    last = pending[0] == 0
+                if last: stages.put(q_out, FIN)
+                return
+            extracted = self._extract_section(sec, sec["_visual"])
+            stages.put(q_out, (sec, extracted))
+
+    def _stream_embed(self, stages, q_in, q_out):
+        buffer = []
+        n_textos = 0
+        while True:
+            item = stages.get(q_in)
+            if item is not FIN:
+                buffer.append(item)
+                n_textos += len(self.embed_chunker.spans(item[0].get('text', ''))) + len(self._collect_requirement_nodes(item[1]))
+            if buffer and (item is FIN or n_textos >= self.embed_batch_size):
+                chunks = [sec for sec, _ in buffer]
+                secciones = self._embed_sections(chunks, [ext for _, ext in buffer])
+                visual = {}
+                for sec in chunks: visual.update(sec["_visual"])
+                stages.put(q_out, (secciones, visual))
+                buffer, n_textos = [], 0
+            if item is FIN:
+                stages.put(q_out, FIN)
+                return
+
+    def _stream_persist(self, stages, q_in, pdf_db_id, counters, lease=None):
+        with db_connection() as conn:
+            cur = conn.cursor()
+            while True:
+                item = stages.get(q_in)
+                if item is FIN: return
+                secciones, visual = item
+                if lease: lease.fence(cur)
+                sec_ids, n_nodos = write_document_sections(cur, pdf_db_id, secciones)
+                if visual:
+                    cur.execute("""
+                        UPDATE registro_pdfs
+                        SET metadata_archivo = jsonb_set(metadata_archivo, '{visual_content}',
+                            COALESCE(metadata_archivo->'visual_content', '{}'::jsonb) || %s::jsonb)
+                        WHERE id = %s
+                    """, (json.dumps(visual), pdf_db_id))
+                conn.commit()
+                counters["sections"] += len(sec_ids)
+                counters["nodes"] += n_nodos
+                counters["batches"] += 1
+
+    # ---------------------------------------------------------
+    # HELPERS COMPARTIDOS (batch y streaming)
+    # ---------------------------------------------------------
+    def _insert_licitacion(self, cur, lic_id_interno, taxonomy):
+        cur.execute("""
+            INSERT INTO registro_licitaciones (codigo_proceso, entidad, estado_actual, metadata_global)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (codigo_proceso) DO UPDATE 
+            SET estado_actual = 'PROCESANDO',
+                metadata_global = EXCLUDED.metadata_global,
+                version = registro_licitaciones.version + 1
+            RETURNING id;
+        """, (
+            lic_id_interno, 
+            "Entidad Pendiente", 
+            "PROCESANDO", 
+            json.dumps(taxonomy)
+        ))
+        return cur.fetchone()[0]
+
+    def _insert_pdf(self, cur, lic_db_id, pdf_path, file_meta):
         cur.execute("""
-            INSERT INTO nodos_vectorizados (seccion_id, tipo_nodo, contenido_texto, metadata_nodo, embedding_vec)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (sec_id, node_type, concept, json.dumps(item_dict), vec))
+            INSERT INTO registro_pdfs (licitacion_id, nombre_archivo, ruta_almacenamiento, metadata_archivo)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id;
+        """, (lic_db_id, os.path.basename(pdf_path), pdf_path, json.dumps(file_meta)))
+        return cur.fetchone()[0]
 
+    def _embed_sections(self, chunks, extracted_by_chunk):
+        """
+        Vectoriza en lote las ventanas de cada chunk y los conceptos de sus
+        requisitos y arma las filas de sección (con sus nodos) que consume
+        write_document_sections. Cada ventana es un nodo CHUNK_TEXTO de la
+        misma sección, así el vector cubre todo el texto y no solo el inicio.
+        """
+        # Un solo pase por el embedder: primero las ventanas y luego los conceptos
+        windows = []  # (indice_chunk, char_start, char_end)
+        for idx, chunk in enumerate(chunks):
+            for start, end in self.embed_chunker.spans(chunk.get('text', '')):
+                windows.append((idx, start, end))
+
+        req_nodes = []  # (indice_chunk, tipo_nodo, concepto, item)
+        for idx, extracted in enumerate(extracted_by_chunk):
+            for node_type, concept, item in self._collect_requirement_nodes(extracted):
+                req_nodes.append((idx, node_type, concept, item))
+
+        textos = [chunks[idx].get('text', '')[start:end] for idx, start, end in windows]
+        textos += [str(concept)[:500] for _, _, concept, _ in req_nodes]
+        vectores = self._embed_batch(textos)
+        window_vecs = vectores[:len(windows)]
+        req_vecs = vectores[len(windows):]
+
+        nodes_by_chunk = {}
+        total_by_chunk = {}
+        for idx, _, _ in windows:
+            total_by_chunk[idx] = total_by_chunk.get(idx, 0) + 1
+        for (idx, start, end), text, vec in zip(windows, textos, window_vecs):
+            nodos = nodes_by_chunk.setdefault(idx, [])
+            meta = {"ventana": len(nodos), "total_ventanas": total_by_chunk[idx],
+                    "char_start": start, "char_end": end}
+            nodos.append(('CHUNK_TEXTO', text, meta, vec))
+        for (idx, node_type, concept, item), vec in zip(req_nodes, req_vecs):
+            nodes_by_chunk.setdefault(idx, []).append((node_type, concept, item, vec))
+
+        secciones = []
+        for idx, chunk in enumerate(chunks):
+            page_num = chunk.get('page_start') or 1
+            secciones.append({
+                "titulo": chunk.get('title', f"Página {page_num}"),
+                "categoria": chunk.get('category', 'GENERAL'),
+                "metadata_extracted": extracted_by_chunk[idx],
+                "page_start": chunk.get('page_start'),
+                "page_end": chunk.get('page_end'),
+                "orden": chunk.get('orden', idx),
+                "nodos": nodes_by_chunk.get(idx, [])
+            })
+        return secciones
+
+    def _collect_requirement_nodes(self, extracted):
+        """Aplana el JSON de Gemini en (tipo_nodo, concepto, item) listos para vectorizar."""
+        nodes = []
+        if not extracted: return nodes
+
+        for key in ['juridico', 'financiero']:
+            for item in extracted.get(key, []):
+                nodes.append((f'REQUISITO_{key.upper()}', self._concept_of(item), item))
+
+        exp = extracted.get('experiencia', {})
+        if exp and 'filtros' in exp:
+            for item in exp['filtros']:
+                nodes.append(('REQUISITO_EXPERIENCIA', self._concept_of(item), item))
+        return nodes
+
+    def _concept_of(self, item_dict):
+        concept = item_dict.get('concepto', 'N/A')
+        if not concept: concept = "Indefinido"
+        return concept
 
+    def _embed_batch(self, texts):
+        """Vectoriza una lista de textos en lotes de `embed_batch_size`."""
+        if not texts: return []
+        t0 = time.perf_counter()
+        vecs = self.embedder.encode(
+            texts,
+            batch_size=self.embed_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        print(f" Embeddings: {len(texts)} textos en {time.perf_counter() - t0:.2f}s (batch={self.embed_batch_size})")
+        return vecs
 
     # ---------------------------------------------------------
     # MÉTODOS GEMINI (MODO COMPATIBILIDAD V1)
     # ---------------------------------------------------------
+    def _init_gemini(self):
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            print(" WARNING: GOOGLE_API_KEY not found.")
+            self.client = None
+        else:
+            try:
+                http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+                self.client = genai.Client(api_key=api_key, http_options=http_options)
+                print(" Using Google GenAI Client (Default/Beta).")
+            except Exception as e:
+                print(f" Error init Gemini: {e}")
+                self.client = None
+        
+        self.model_name = "gemini-2.5-flash" 
+        self.llm_max_concurrency = GEMINI_MAX_CONCURRENCY
+        self.rate_limiter = TokenBucket(GEMINI_RPS, GEMINI_BURST)
+        self.llm_cache = get_llm_cache()
+
+    def _generate(self, prompt):
+        """generate_content con rate limit compartido y backoff ante 429."""
+        return call_with_backoff(
+            lambda: self.client.models.generate_content(model=self.model_name, contents=prompt),
+            bucket=self.rate_limiter,
+            max_retries=GEMINI_MAX_RETRIES
+        )
+
+    def _generate_json(self, prompt, prompt_version):
+        """Respuesta JSON de Gemini; consulta antes la caché persistente (model, versión, prompt)."""
+        key = None
+        if self.llm_cache:
+            key = self.llm_cache.make_key(self.model_name, prompt_version, prompt)
+            cached = self.llm_cache.get(key)
+            if cached is not None:
+                return json.loads(cached)
+
+        response = self._generate(prompt)
+        # Limpieza manual
+        txt = response.text.replace("```json", "").replace("```", "").strip()
+        result = json.loads(txt)
+        # Solo se cachean respuestas que parsean: los errores se reintentan la próxima vez
+        if key: self.llm_cache.set(key, txt)
+        return result
+
+    def _extract_all_requirements(self, chunks, visual_metadata):
+        """
+        Extrae requisitos de todas las secciones relevantes en paralelo. Cada
+        sección se parte en ventanas acotadas para el prompt; todas las ventanas
+        comparten el pool y luego se fusionan por sección (orden preservado).
+        """
+        tasks = []  # (indice_chunk, ventana, categoria, info_visual)
+        for idx, chunk in enumerate(chunks):
+            for window, cat, info_visual in self._extraction_tasks(chunk, visual_metadata):
+                tasks.append((idx, window, cat, info_visual))
+
+        results = map_bounded(
+            lambda t: self._extract_requirements_gemini(t[1], t[2], t[3]) or {},
+            tasks, self.llm_max_concurrency
+        )
+        by_chunk = [[] for _ in chunks]
+        for (idx, _, _, _), res in zip(tasks, results):
+            by_chunk[idx].append(res)
+        return [self._merge_extractions(r) for r in by_chunk]
+
+    def _extract_section(self, chunk, visual_metadata):
+        results = [self._extract_requirements_gemini(window, cat, info_visual) or {}
+                   for window, cat, info_visual in self._extraction_tasks(chunk, visual_metadata)]
+        return self._merge_extractions(results)
+
+    def _extraction_tasks(self, chunk, visual_metadata):
+        """Ventanas de la sección a enviar a Gemini, con su categoría y contexto visual."""
+        cat = chunk.get('category', 'GENERAL')
+        if cat not in CATEGORIAS_EXTRACCION: return []
+        page_num = chunk.get('page_start') or 1
+        info_visual_pagina = visual_metadata.get(f"page_{page_num}", "")
+        return [(window, cat, info_visual_pagina) for window in self.llm_chunker.split(chunk.get('text', ''))]
+
+    def _merge_extractions(self, results):
+        """Une las respuestas de varias ventanas de una misma sección (sin duplicar items del solape)."""
+        results = [r for r in results if r]
+        if not results: return {}
+        if len(results) == 1: return results[0]
+
+        merged = {"juridico": [], "financiero": [], "experiencia": {"filtros": []}}
+        seen = set()
+
+        def _add(target, items):
+            for item in items or []:
+                key = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+                if key in seen: continue
+                seen.add(key)
+                target.append(item)
+
+        for res in results:
+            _add(merged["juridico"], res.get("juridico"))
+            _add(merged["financiero"], res.get("financiero"))
+            exp = res.get("experiencia") or {}
+            if isinstance(exp, dict):
+                _add(merged["experiencia"]["filtros"], exp.get("filtros"))
+                for k, v in exp.items():
+                    if k != "filtros" and v and not merged["experiencia"].get(k):
+                        merged["experiencia"][k] = v
+            for k, v in res.items():
+                if k not in merged and v:
+                    merged[k] = v
+        return merged
+
     def _infer_taxonomy_gemini(self, text):
         if not self.client: return {"familia_principal": "No API Key"}
         
@@ -211,13 +761,7 @@ class TenderPipeline:
         """
         try:
             # CORRECCIÓN: Sin 'config'. Esto evita el error 400.
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            # Limpieza manual
-            txt = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(txt)
+            return self._generate_json(prompt, TAXONOMY_PROMPT_VERSION)
         except Exception as e:
             print(f"Gemini Tax Error: {e}")
             return {"familia_principal": "Error IA"}
@@ -236,12 +780,7 @@ class TenderPipeline:
         }}
         """
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            txt = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(txt)
+            return self._generate_json(prompt, EXTRACTION_PROMPT_VERSION)
         except Exception as e:
             print(f"Gemini Ext Error: {e}")
             return {}
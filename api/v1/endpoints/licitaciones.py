@@ -1,75 +1,221 @@
 import shutil
 import os
-from typing import List, Dict, Any
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from api.orchestrator import TenderPipeline
-from database.connection import get_db_connection
+import uuid
+import json
+import base64
+import datetime
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Query, Response, Header
+from fastapi.responses import StreamingResponse, JSONResponse
+from database.connection import db_connection
+from database import jobs
+from api.core.lru_cache import LRUCache
 
 router = APIRouter()
-# Initialize pipeline once (could also be a dependency)
-try:
-    pipeline = TenderPipeline()
-except Exception as e:
-    print(f"Failed to initialize pipeline: {e}")
-    pipeline = None
-
-@router.post("/ingest", summary="Ingesta y procesa un PDF de licitación")
-async def ingest_licitacion(
+
+# Directorio compartido entre la API y los workers (volumen común en multi-nodo)
+UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", "uploads")
+JOB_MAX_INTENTOS = int(os.getenv("JOB_MAX_INTENTOS", "3"))
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "50"))
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "2000"))
+
+@router.post("/ingest", status_code=202, summary="Encola un PDF de licitación para ingesta")
+def ingest_licitacion(
     file: UploadFile = File(...), 
     lic_id: str = Form(..., description="ID interno de la licitación")
 ):
-    if not pipeline:
-        raise HTTPException(status_code=503, detail="Pipeline service unavailable")
-        
-    # Save temp file
-    temp_path = f"temp_{file.filename}"
+    # El procesamiento (Florence + Gemini) lo hacen los workers (api/worker.py);
+    # aquí solo se guarda el archivo y se crea el job.
+    job_id = str(uuid.uuid4())
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(UPLOAD_DIR, f"{job_id}_{os.path.basename(file.filename)}")
     try:
-        with open(temp_path, "wb") as buffer:
+        with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
-        
-        # Process (Writes to registro_licitaciones, etc.)
-        result = pipeline.process_pdf(temp_path, lic_id)
-        return result
-        
+
+        with db_connection() as conn:
+            jobs.enqueue_job(conn.cursor(), job_id, lic_id, file.filename, file_path, JOB_MAX_INTENTOS)
+            conn.commit()
     except Exception as e:
+        if os.path.exists(file_path):
+            os.remove(file_path)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
-@router.get("/", summary="Listar todas las licitaciones registradas")
-def list_licitaciones():
-    conn = get_db_connection()
+    return {
+        "job_id": job_id,
+        "estado": jobs.PENDIENTE,
+        "codigo_proceso": lic_id,
+        "status_url": f"/api/v1/licitaciones/jobs/{job_id}"
+    }
+
+@router.get("/jobs/{job_id}", summary="Estado de un job de ingesta")
+def get_ingest_job(job_id: uuid.UUID):
+    with db_connection() as conn:
+        job = jobs.get_job(conn.cursor(), str(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    job.pop("ruta_archivo", None)
+    return job
+
+# --- LISTADO (keyset sobre (fecha_hora_ingesta, id), índice idx_lic_fecha_id) ---
+
+_LIST_COLUMNS = "id, codigo_proceso, entidad, estado_actual, fecha_hora_ingesta"
+
+
+def _row_to_item(r):
+    return {"id": r[0], "codigo_proceso": r[1], "entidad": r[2], "estado": r[3], "fecha": r[4]}
+
+
+def _encode_cursor(fecha, lic_id):
+    raw = json.dumps([fecha.isoformat(), lic_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor):
     try:
+        fecha, lic_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.datetime.fromisoformat(fecha), int(lic_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _list_filters(estado, entidad):
+    where, params = [], []
+    if estado:
+        where.append("estado_actual = %s")
+        params.append(estado)
+    if entidad:
+        where.append("entidad ILIKE %s")
+        params.append(f"%{entidad}%")
+    return where, params
+
+
+@router.get("/", summary="Listar licitaciones (paginado por cursor)")
+def list_licitaciones(
+    response: Response,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    estado: Optional[str] = Query(None, description="Filtra por estado_actual (ej: INDEXADO)"),
+    entidad: Optional[str] = Query(None, description="Filtra por entidad (contiene, sin mayúsculas)")
+):
+    """
+    Devuelve una página ordenada por fecha de ingesta descendente. La
+    siguiente página se pide con el cursor de la cabecera X-Next-Cursor
+    (ausente en la última), así el costo no depende del tamaño de la tabla.
+    """
+    where, params = _list_filters(estado, entidad)
+    if cursor:
+        where.append("(fecha_hora_ingesta, id) < (%s, %s)")
+        params.extend(_decode_cursor(cursor))
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    with db_connection() as conn:
         cur = conn.cursor()
-        cur.execute("""
-            SELECT id, codigo_proceso, entidad, estado_actual, fecha_hora_ingesta 
-            FROM registro_licitaciones 
-            ORDER BY fecha_hora_ingesta DESC
-        """)
+        cur.execute(f"""
+            SELECT {_LIST_COLUMNS}
+            FROM registro_licitaciones
+            {where_sql}
+            ORDER BY fecha_hora_ingesta DESC, id DESC
+            LIMIT %s
+        """, params + [limit + 1])
         rows = cur.fetchall()
-        result = []
-        for r in rows:
-            result.append({
-                "id": r[0],
-                "codigo_proceso": r[1],
-                "entidad": r[2],
-                "estado": r[3],
-                "fecha": r[4]
-            })
-        return result
-    finally:
-        conn.close()
+
+    # Se pide una fila de más para saber si hay otra página
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1][4], rows[-1][0])
+    return [_row_to_item(r) for r in rows]
+
+
+@router.get("/export", summary="Exportar licitaciones en NDJSON (streaming)")
+def export_licitaciones(
+    estado: Optional[str] = Query(None),
+    entidad: Optional[str] = Query(None)
+):
+    """
+    Exporta todas las licitaciones filtradas como NDJSON (una por línea).
+    Usa un cursor de servidor: las filas se leen y envían por bloques de
+    EXPORT_FETCH_SIZE sin materializar la tabla en memoria.
+    """
+    where, params = _list_filters(estado, entidad)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    def _stream():
+        with db_connection() as conn:
+            cur = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+            cur.itersize = EXPORT_FETCH_SIZE
+            cur.execute(f"""
+                SELECT {_LIST_COLUMNS}
+                FROM registro_licitaciones
+                {where_sql}
+                ORDER BY fecha_hora_ingesta DESC, id DESC
+            """, params)
+            for r in cur:
+                item = _row_to_item(r)
+                item["fecha"] = item["fecha"].isoformat() if item["fecha"] else None
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+            cur.close()
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": "attachment; filename=licitaciones.ndjson"})
+
+# --- DETALLE (caché LRU por proceso + ETag) ---
+
+# Campos proyectables del detalle; contenido_extraido es el JSON pesado de cada sección
+DETAIL_FIELDS = ("codigo", "metadata_global", "secciones_procesadas", "contenido_extraido")
+DETAIL_CACHE_SIZE = int(os.getenv("DETAIL_CACHE_SIZE", "512"))
+DETAIL_CACHE_TTL = float(os.getenv("DETAIL_CACHE_TTL", "300"))
+
+_detail_cache = LRUCache(DETAIL_CACHE_SIZE, DETAIL_CACHE_TTL)
+
+
+def _parse_fields(fields):
+    if not fields: return DETAIL_FIELDS
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(DETAIL_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos no soportados: {sorted(unknown)}")
+    # El contenido va dentro de las secciones
+    if "contenido_extraido" in requested: requested.add("secciones_procesadas")
+    return tuple(f for f in DETAIL_FIELDS if f in requested)
+
+
+def _etag(lic_db_id, version, fields):
+    return f'"{lic_db_id}-v{version}-{"+".join(fields)}"'
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match: return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _not_modified(etag):
+    return Response(status_code=304, headers={"ETag": etag})
+
 
 @router.get("/{lic_id}", summary="Obtener detalle completo de una licitación")
-def get_licitacion_details(lic_id: str):
-    conn = get_db_connection()
-    try:
+def get_licitacion_details(
+    lic_id: str,
+    fields: Optional[str] = Query(None, description=f"Campos a incluir, separados por coma: {', '.join(DETAIL_FIELDS)}"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Una licitación INDEXADO no cambia hasta una nueva ingesta (que sube su
+    `version`), así que su detalle se guarda en una caché LRU del proceso y
+    se sirve con ETag. La versión se comprueba siempre con una consulta de una
+    fila (la re-ingesta ocurre en el worker, que no ve esta caché): con
+    If-None-Match vigente responde 304 y, si la entrada cacheada es de esa
+    versión, se ahorran las secciones.
+    """
+    proj = _parse_fields(fields)
+
+    with db_connection() as conn:
         cur = conn.cursor()
         
-        # 1. Get Global Data
+        # 1. Versión vigente (para el ETag y para validar la caché)
         cur.execute("""
-            SELECT id, codigo_proceso, metadata_global 
+            SELECT id, codigo_proceso, version, estado_actual
             FROM registro_licitaciones 
             WHERE codigo_proceso = %s
         """, (lic_id,))
@@ -77,29 +223,44 @@ def get_licitacion_details(lic_id: str):
         if not lic_row:
             raise HTTPException(status_code=404, detail="Licitación no encontrada")
         
-        lic_db_id = lic_row[0]
+        lic_db_id, codigo, version, estado = lic_row
+        etag = _etag(lic_db_id, version, proj)
+        # El cliente ya tiene esta versión: no hace falta leer nada más
+        if _etag_matches(if_none_match, etag): return _not_modified(etag)
+
+        cached = _detail_cache.get((lic_id, proj))
+        if cached is not None:
+            if cached[0] == etag:
+                return JSONResponse(cached[1], headers={"ETag": etag})
+            # Re-ingestada desde que se cacheó
+            _detail_cache.invalidate(lambda key: key[0] == lic_id)
         
+        payload = {"version": version}
+        if "codigo" in proj: payload["codigo"] = codigo
+        if "metadata_global" in proj:
+            cur.execute("SELECT metadata_global FROM registro_licitaciones WHERE id = %s", (lic_db_id,))
+            payload["metadata_global"] = cur.fetchone()[0]
+
         # 2. Get Sections
         # We join with registro_pdfs to link sections to the process
-        cur.execute("""
-            SELECT s.titulo_detectado, s.categoria_seccion, s.metadata_extracted
-            FROM secciones_documento s
-            JOIN registro_pdfs p ON s.pdf_id = p.id
-            WHERE p.licitacion_id = %s
-        """, (lic_db_id,))
-        
-        sections = []
-        for row in cur.fetchall():
-            sections.append({
-                "titulo": row[0],
-                "categoria": row[1],
-                "contenido_extraido": row[2]
-            })
-            
-        return {
-            "codigo": lic_row[1],
-            "metadata_global": lic_row[2],
-            "secciones_procesadas": sections
-        }
-    finally:
-        conn.close()
+        if "secciones_procesadas" in proj:
+            con_contenido = "contenido_extraido" in proj
+            cur.execute("""
+                SELECT s.titulo_detectado, s.categoria_seccion{contenido}
+                FROM secciones_documento s
+                JOIN registro_pdfs p ON s.pdf_id = p.id
+                WHERE p.licitacion_id = %s
+                ORDER BY p.id, s.orden NULLS LAST, s.id
+            """.format(contenido=", s.metadata_extracted" if con_contenido else ""), (lic_db_id,))
+
+            sections = []
+            for row in cur.fetchall():
+                section = {"titulo": row[0], "categoria": row[1]}
+                if con_contenido: section["contenido_extraido"] = row[2]
+                sections.append(section)
+            payload["secciones_procesadas"] = sections
+
+    # Solo lo inmutable entra a la caché (en proceso puede cambiar en cualquier momento)
+    if estado == "INDEXADO":
+        _detail_cache.set((lic_id, proj), (etag, payload))
+    return JSONResponse(payload, headers={"ETag": etag})
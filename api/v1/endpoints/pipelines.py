@@ -1,7 +1,15 @@
 from fastapi import APIRouter
+from api.core.llm_cache import get_llm_cache
 
 router = APIRouter()
 
 @router.get("/")
 def get_pipelines():
     return {"message": "Pipeline logic now integrated into Orquestador (TenderPipeline)."}
+
+@router.get("/llm-cache", summary="Contadores de la caché de respuestas LLM")
+def get_llm_cache_stats():
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
@@ -0,0 +1,142 @@
+import os
+import time
+import socket
+import threading
+
+from api.orchestrator import TenderPipeline
+from api.core.model_registry import registry, MODEL_WARMUP
+from api.core.inference_client import INFERENCE_SERVER_URL
+from database.connection import db_connection
+from database.migrations import ensure_schema
+from database import jobs
+
+# --- CONFIGURACIÓN ---
+LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+HEARTBEAT_SECONDS = max(1, LEASE_SECONDS // 3)
+POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+RETRY_BACKOFF_SECONDS = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))
+
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class _Heartbeat(threading.Thread):
+    """Renueva el lease del job mientras el pipeline trabaja (una conexión del pool por latido)."""
+
+    def __init__(self, job_id):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.stop_event = threading.Event()
+        self.lease_lost = False
+
+    def run(self):
+        while not self.stop_event.wait(HEARTBEAT_SECONDS):
+            try:
+                with db_connection() as conn:
+                    renewed = jobs.heartbeat(conn.cursor(), self.job_id, WORKER_ID, LEASE_SECONDS)
+                    conn.commit()
+                if not renewed:
+                    print(f"  Lease perdido para job {self.job_id}")
+                    self.lease_lost = True
+                    return
+            except Exception as e:
+                print(f"  Error heartbeat job {self.job_id}: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+    # --- Guarda de lease para el pipeline ---
+    def check(self):
+        """Entre etapas: corta el pipeline si el heartbeat ya vio el lease perdido."""
+        if self.lease_lost:
+            raise jobs.LeaseLost(f"Lease perdido para job {self.job_id}")
+
+    def fence(self, cur):
+        """Dentro de la transacción que escribe: exige el lease vigente y lo bloquea hasta el commit."""
+        self.check()
+        if not jobs.hold_lease(cur, self.job_id, WORKER_ID):
+            self.lease_lost = True
+            raise jobs.LeaseLost(f"Lease vencido para job {self.job_id}")
+
+
+def _claim_next():
+    with db_connection() as conn:
+        cur = conn.cursor()
+        for _, ruta in jobs.reap_expired(cur):
+            _remove_file(ruta)
+        job = jobs.claim_job(cur, WORKER_ID, LEASE_SECONDS)
+        conn.commit()
+        return job
+
+
+def _finish(job, resultado=None, error=None):
+    with db_connection() as conn:
+        cur = conn.cursor()
+        if error is None:
+            estado = jobs.COMPLETADO if jobs.complete_job(cur, job["id"], WORKER_ID, resultado) else None
+        else:
+            estado = jobs.fail_job(cur, job["id"], WORKER_ID, error, RETRY_BACKOFF_SECONDS)
+        conn.commit()
+    if estado is None:
+        # La fila ya es de otro worker (lease vencido y reclamado)
+        raise jobs.LeaseLost(f"Job {job['id']} ya no pertenece a {WORKER_ID}")
+    return estado
+
+
+def _remove_file(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def process_job(pipeline, job):
+    print(f"[{WORKER_ID}] Job {job['id']} ({job['codigo_proceso']}) intento {job['intentos']}/{job['max_intentos']}")
+    hb = _Heartbeat(job["id"])
+    hb.start()
+    try:
+        resultado = pipeline.process_pdf(job["ruta_archivo"], job["codigo_proceso"], lease=hb)
+        error = None
+    except Exception as e:
+        resultado, error = None, e
+    finally:
+        hb.stop()
+
+    if hb.lease_lost or isinstance(error, jobs.LeaseLost):
+        # Otro worker ya lo retomó: no tocamos el estado ni el archivo
+        return None
+
+    try:
+        estado = _finish(job, resultado, error)
+    except jobs.LeaseLost as e:
+        print(f"[{WORKER_ID}] {e}: no se toca el archivo")
+        return None
+    print(f"[{WORKER_ID}] Job {job['id']} -> {estado}" + (f" ({error})" if error else ""))
+    if estado in (jobs.COMPLETADO, jobs.FALLIDO):
+        _remove_file(job["ruta_archivo"])
+    return estado
+
+
+def run_worker():
+    print(f"WORKER {WORKER_ID} | lease={LEASE_SECONDS}s heartbeat={HEARTBEAT_SECONDS}s")
+    with db_connection() as conn:
+        ensure_schema(conn)
+    pipeline = TenderPipeline()
+    # Los modelos cargan en segundo plano; el primer job espera solo lo que falte.
+    # Con servidor de inferencia no se carga nada en local.
+    if INFERENCE_SERVER_URL:
+        print(f"  Inferencia remota: {INFERENCE_SERVER_URL}")
+    registry.warmup(MODEL_WARMUP or ([] if INFERENCE_SERVER_URL else ["embedder", "florence"]))
+    while True:
+        try:
+            job = _claim_next()
+        except Exception as e:
+            print(f"Error reclamando job: {e}")
+            job = None
+
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        process_job(pipeline, job)
+
+
+if __name__ == "__main__":
+    run_worker()
@@ -0,0 +1,81 @@
+"""
+Paridad y velocidad de los backends del embedder (torch / onnx / onnx-int8).
+
+Para cada backend: textos/s, coseno fila a fila contra torch y recall@K de
+búsquedas cuya consulta se vectoriza con el backend pero el corpus sigue
+siendo el de torch (el caso real: vectores nuevos contra vector(768) ya
+guardados). Sale con código 1 si algún backend queda bajo --min-cosine.
+
+Uso:
+    python -m benchmarks.bench_embedding_backends                     # textos sintéticos
+    python -m benchmarks.bench_embedding_backends --pdf test.pdf --threads 4
+"""
+import argparse
+import sys
+import time
+import numpy as np
+
+from api.core.embedding_backends import BACKENDS, load_embedder, cosine_parity
+from api.core.model_registry import EMBEDDING_MODEL
+from benchmarks.bench_embeddings import _textos_sinteticos, _textos_pdf
+
+
+def _encode(embedder, textos, batch_size):
+    embedder.encode("warmup")
+    t0 = time.perf_counter()
+    vecs = embedder.encode(textos, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(vecs, dtype=np.float32), time.perf_counter() - t0
+
+
+def _topk(queries, corpus, k):
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def _normalize(m):
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf", default=None)
+    ap.add_argument("-n", type=int, default=500, help="Número de textos sintéticos")
+    ap.add_argument("--backends", default=",".join(BACKENDS))
+    ap.add_argument("--threads", type=int, default=0)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--min-cosine", type=float, default=0.99)
+    args = ap.parse_args()
+
+    textos = _textos_pdf(args.pdf) if args.pdf else _textos_sinteticos(args.n)
+    # Consultas: el comienzo de cada texto (como una búsqueda corta contra el corpus)
+    consultas = [t[:120] for t in textos[::max(1, len(textos) // 100)]]
+    print(f"Modelo: {EMBEDDING_MODEL} | textos: {len(textos)} | consultas: {len(consultas)} | "
+          f"hilos: {args.threads or 'auto'}")
+
+    referencia = load_embedder(EMBEDDING_MODEL, "torch", args.threads)
+    ref, t_ref = _encode(referencia, textos, args.batch_size)
+    ref_q, _ = _encode(referencia, consultas, args.batch_size)
+    corpus = _normalize(ref)
+    truth = _topk(_normalize(ref_q), corpus, args.k)
+    print(f"  {'torch':10s}: {len(textos) / t_ref:7.1f} textos/s (referencia)")
+
+    fallo = False
+    for backend in [b for b in args.backends.split(",") if b != "torch"]:
+        embedder = load_embedder(EMBEDDING_MODEL, backend, args.threads)
+        vecs, t = _encode(embedder, textos, args.batch_size)
+        q, _ = _encode(embedder, consultas, args.batch_size)
+        par = cosine_parity(ref, vecs)
+        found = _topk(_normalize(q), corpus, args.k)
+        recall = float(np.mean([len(set(f) & set(tr)) / args.k for f, tr in zip(found, truth)]))
+        ok = par["min"] >= args.min_cosine
+        fallo |= not ok
+        print(f"  {backend:10s}: {len(textos) / t:7.1f} textos/s (x{t_ref / t:.2f}) | coseno medio {par['mean']:.4f} "
+              f"min {par['min']:.4f} p01 {par['p01']:.4f} | recall@{args.k} vs corpus torch {recall:.3f} "
+              f"{'OK' if ok else 'BAJO ' + str(args.min_cosine)}")
+
+    sys.exit(1 if fallo else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compara el embedding ítem por ítem (camino anterior de TenderPipeline) contra
+el embedding en lote que usa ahora `TenderPipeline._embed_batch`.
+
+Uso:
+    python -m benchmarks.bench_embeddings                # textos sintéticos
+    python -m benchmarks.bench_embeddings --pdf test.pdf # chunks reales
+"""
+import argparse
+import time
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+
+def _textos_sinteticos(n):
+    base = ("El proponente deberá acreditar un índice de liquidez mayor o igual a 1.5 "
+            "y experiencia en contratos cuyo objeto sea el suministro de equipos. ")
+    return [f"{i} {base * (1 + i % 4)}"[:800] for i in range(n)]
+
+
+def _textos_pdf(pdf_path):
+    from api.core.pdf_utils import PDFResilientParser
+    chunks = PDFResilientParser().process(pdf_path)
+    return [c.get('text', '')[:800] for c in chunks]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf", default=None)
+    ap.add_argument("-n", type=int, default=300, help="Número de textos sintéticos")
+    ap.add_argument("--batch-sizes", default="16,32,64,128")
+    args = ap.parse_args()
+
+    textos = _textos_pdf(args.pdf) if args.pdf else _textos_sinteticos(args.n)
+    print(f"Textos: {len(textos)}")
+
+    embedder = SentenceTransformer('all-mpnet-base-v2', device='cpu')
+    embedder.encode("warmup")
+
+    # 1. Camino anterior: un encode() por texto
+    t0 = time.perf_counter()
+    ref = np.stack([embedder.encode(t) for t in textos])
+    t_item = time.perf_counter() - t0
+    print(f"Ítem por ítem: {t_item:.2f}s ({len(textos) / t_item:.1f} textos/s)")
+
+    # 2. Camino en lote
+    for bs in [int(x) for x in args.batch_sizes.split(",")]:
+        t0 = time.perf_counter()
+        vecs = embedder.encode(textos, batch_size=bs, convert_to_numpy=True, show_progress_bar=False)
+        t_batch = time.perf_counter() - t0
+        diff = float(np.abs(vecs - ref).max())
+        print(f"Lote batch={bs:4d}: {t_batch:.2f}s ({len(textos) / t_batch:.1f} textos/s) "
+              f"speedup x{t_item / t_batch:.1f} | max |Δ| = {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Mide la extracción secuencial vs concurrente (rate limit + backoff) contra el
+stub local de Gemini. No necesita API key real ni red.
+
+Uso:
+    python -m benchmarks.bench_gemini_concurrency --sections 24 --latency 1.0 --error-rate 0.1
+"""
+import argparse
+import time
+from google import genai
+from google.genai import types
+
+from api.core.llm_concurrency import TokenBucket, call_with_backoff, map_bounded
+from benchmarks.gemini_stub_server import start_stub
+
+MODEL = "gemini-2.5-flash"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sections", type=int, default=24)
+    ap.add_argument("--latency", type=float, default=1.0)
+    ap.add_argument("--error-rate", type=float, default=0.1)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rps", type=float, default=20)
+    args = ap.parse_args()
+
+    server, state, url = start_stub(latency=args.latency, error_rate=args.error_rate)
+    client = genai.Client(api_key="stub", http_options=types.HttpOptions(base_url=url))
+    prompts = [f"Extrae requisitos FINANCIERO. Texto: sección {i}" for i in range(args.sections)]
+
+    def _call(bucket):
+        def _one(prompt):
+            return call_with_backoff(
+                lambda: client.models.generate_content(model=MODEL, contents=prompt),
+                bucket=bucket, max_retries=8, base_delay=0.2
+            ).text
+        return _one
+
+    t0 = time.perf_counter()
+    map_bounded(_call(None), prompts, 1)
+    t_seq = time.perf_counter() - t0
+    print(f"Secuencial: {t_seq:.2f}s")
+
+    state.max_in_flight = 0
+    bucket = TokenBucket(args.rps, args.concurrency)
+    t0 = time.perf_counter()
+    resultados = map_bounded(_call(bucket), prompts, args.concurrency)
+    t_conc = time.perf_counter() - t0
+    print(f"Concurrente (workers={args.concurrency}, rps={args.rps}): {t_conc:.2f}s "
+          f"speedup x{t_seq / t_conc:.1f} | max concurrentes en stub={state.max_in_flight}")
+    print(f"Requests={state.requests} 429 simulados={state.rate_limited} respuestas={len(resultados)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Tamaño y recall del almacenamiento compacto de embeddings.
+
+--offline: sin base de datos, con NumPy. Compara float32 exacto contra float16
+(lo que guarda halfvec) y contra int8 con escala por vector, con y sin
+re-scoring exacto de los candidatos.
+
+Con base de datos: tamaño de columnas e índices de nodos_vectorizados y
+recall@K de search_nodos (halfvec, con y sin re-scoring) contra float32 exacto.
+
+Uso:
+    python -m benchmarks.bench_halfvec --offline -n 50000 --queries 200
+    python -m benchmarks.bench_halfvec --offline --npy embeddings.npy
+    python -m benchmarks.bench_halfvec --queries 100 -k 10
+"""
+import argparse
+import time
+import numpy as np
+
+DIM = 768
+
+
+def _normalize(m):
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+def _synthetic(n, rng):
+    # Vectores agrupados (como embeddings reales de un mismo dominio), no ruido isotrópico
+    centers = rng.standard_normal((max(1, n // 200), DIM)).astype(np.float32)
+    m = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.standard_normal((n, DIM)).astype(np.float32)
+    return _normalize(m).astype(np.float32)
+
+
+def _int8(m):
+    scale = np.abs(m).max(axis=1, keepdims=True) / 127.0
+    q = np.round(m / np.maximum(scale, 1e-12)).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+def _topk(scores, k):
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(idx, np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1), axis=1)
+
+
+def _recall(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def _rescored(approx_scores, exact_m, queries, k, oversample):
+    cand = _topk(approx_scores, k * oversample)
+    out = []
+    for qi, c in enumerate(cand):
+        exact = exact_m[c] @ queries[qi]
+        out.append(c[np.argsort(-exact)[:k]])
+    return out
+
+
+def offline(args):
+    rng = np.random.default_rng(0)
+    base = np.load(args.npy).astype(np.float32) if args.npy else _synthetic(args.n, rng)
+    base = _normalize(base).astype(np.float32)
+    qi = rng.choice(len(base), args.queries, replace=False)
+    queries = _normalize(base[qi] + 0.05 * rng.standard_normal((args.queries, base.shape[1])).astype(np.float32))
+    truth = _topk(queries @ base.T, args.k)
+
+    half = base.astype(np.float16)
+    s_half = queries.astype(np.float16).astype(np.float32) @ half.astype(np.float32).T
+    q8, scale = _int8(base)
+    s_int8 = queries @ (q8.astype(np.float32) * scale).T
+
+    dim = base.shape[1]
+    print(f"Vectores: {len(base)} x {dim} | consultas: {args.queries} | K={args.k}")
+    print(f"  float32 (vector):   {4 * dim + 4} B/vector | recall 1.000 (referencia)")
+    for name, scores, size in (("float16 (halfvec)", s_half, 2 * dim + 4), ("int8 + escala", s_int8, dim + 8)):
+        r = _recall(_topk(scores, args.k), truth)
+        rr = _recall(_rescored(scores, base, queries, args.k, args.oversample), truth)
+        print(f"  {name:18s}: {size} B/vector ({size / (4 * dim + 4):.0%}) | recall@{args.k} {r:.3f} | "
+              f"con re-scoring x{args.oversample}: {rr:.3f}")
+
+
+def with_db(args):
+    from database.connection import get_db_connection
+    from database.compact_embeddings import search_nodos
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT count(*), avg(pg_column_size(embedding_vec)), avg(pg_column_size(embedding_half))
+            FROM nodos_vectorizados
+        """)
+        n, size_vec, size_half = cur.fetchone()
+        print(f"Nodos: {n} | embedding_vec {float(size_vec or 0):.0f} B/fila | embedding_half {float(size_half or 0):.0f} B/fila")
+        for idx in ("idx_nodos_vec", "idx_nodos_half"):
+            cur.execute("SELECT pg_size_pretty(pg_relation_size(to_regclass(%s)))", (idx,))
+            print(f"  {idx}: {cur.fetchone()[0]}")
+
+        cur.execute("""
+            SELECT embedding_vec FROM nodos_vectorizados
+            WHERE embedding_vec IS NOT NULL AND embedding_half IS NOT NULL
+            ORDER BY random() LIMIT %s
+        """, (args.queries,))
+        queries = [np.asarray(r[0].to_numpy() if hasattr(r[0], "to_numpy") else r[0], dtype=np.float32)
+                   for r in cur.fetchall()]
+        conn.rollback()
+
+        def _run(**kw):
+            ids, t = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                ids.append([r[0] for r in search_nodos(cur, q, args.k, **kw)])
+                t.append(1000 * (time.perf_counter() - t0))
+                conn.rollback()
+            return ids, float(np.percentile(t, 50))
+
+        # Referencia exacta: float32 sin índice
+        exact = []
+        for q in queries:
+            cur.execute("SET LOCAL enable_indexscan = off")
+            exact.append([r[0] for r in search_nodos(cur, q, args.k, storage="vector")])
+            conn.rollback()
+
+        for label, kw in (("float32 ANN", {"storage": "vector"}),
+                          ("halfvec ANN", {"storage": "both", "rescore": False}),
+                          (f"halfvec + re-scoring x{args.oversample}", {"storage": "both", "oversample": args.oversample})):
+            ids, p50 = _run(**kw)
+            print(f"  {label:28s}: recall@{args.k} {_recall(ids, exact):.3f} | p50 {p50:.1f} ms")
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--offline", action="store_true")
+    ap.add_argument("--npy", default=None, help="Embeddings reales (N x D) para el modo offline")
+    ap.add_argument("-n", type=int, default=50000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--oversample", type=int, default=4)
+    args = ap.parse_args()
+    offline(args) if args.offline else with_db(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Puntúa una empresa contra N licitaciones sintéticas: bucle de
+calcular_match_total (camino anterior) vs MatchIndex en lote. Verifica que el
+top-K y sus alertas coincidan.
+
+Uso:
+    python -m benchmarks.bench_match_scoring -n 50000 --loop-sample 5000
+"""
+import argparse
+import time
+import numpy as np
+
+from api.core.score import calcular_match_total, _check_financiero
+from api.core.score_batch import MatchIndex
+
+CONCEPTOS = ["Indice de Liquidez", "Nivel de Endeudamiento", "Capital de Trabajo"]
+OPERADORES = [">=", "<=", "="]
+
+
+def _licitaciones_sinteticas(n, dim, n_codes, rng):
+    lics = []
+    for i in range(n):
+        financiero = []
+        if rng.random() < 0.6:
+            for c in rng.choice(len(CONCEPTOS), size=rng.integers(1, 3), replace=False):
+                financiero.append({"concepto": CONCEPTOS[c], "operador": OPERADORES[rng.integers(3)],
+                                   "valor_requerido": str(round(float(rng.uniform(0.2, 2.0)), 1))})
+        lics.append({
+            "id": i,
+            "objeto_vec": rng.standard_normal(dim).astype(np.float32),
+            "codigos_unspsc": [str(c) for c in rng.integers(0, n_codes, size=rng.integers(0, 6))],
+            "metadatos_json": {"requisitos_habilitantes": {"financiero": financiero}}
+        })
+    return lics
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=50000)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--codes", type=int, default=2000, help="Tamaño del vocabulario UNSPSC")
+    ap.add_argument("--loop-sample", type=int, default=5000, help="Licitaciones a puntuar con el bucle")
+    ap.add_argument("-k", type=int, default=20)
+    ap.add_argument("--empresas", type=int, default=50, help="Empresas para la evaluación financiera en lote")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    lics = _licitaciones_sinteticas(args.n, args.dim, args.codes, rng)
+    empresa = {
+        "perfil_vec": rng.standard_normal(args.dim).astype(np.float32),
+        "codigos_unspsc": [str(c) for c in rng.integers(0, args.codes, size=40)],
+        "indicadores": {"Indice de Liquidez": 1.3, "Nivel de Endeudamiento": 0.6, "Capital de Trabajo": 1.0}
+    }
+
+    t0 = time.perf_counter()
+    index = MatchIndex.from_rows(lics)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    top = index.top_k(empresa, k=args.k)
+    t_batch = time.perf_counter() - t0
+    print(f"Licitaciones: {args.n} | índice construido en {t_build:.2f}s")
+    print(f"Lote:  {1000 * t_batch:.1f} ms para las {args.n} licitaciones")
+
+    # Camino anterior sobre una muestra (el total se extrapola)
+    sample = lics[:args.loop_sample]
+    t0 = time.perf_counter()
+    ref = [(calcular_match_total(l, empresa), l["id"]) for l in sample]
+    t_loop = (time.perf_counter() - t0) * args.n / len(sample)
+    print(f"Bucle: {t_loop:.2f}s estimados para {args.n} ({len(sample)} medidas) "
+          f"speedup x{t_loop / t_batch:.0f}")
+
+    # Paridad en la muestra: scores y alertas del top-K
+    sub = MatchIndex.from_rows(sample).top_k(empresa, k=args.k)
+    ref.sort(key=lambda r: (-r[0][0], r[1]))
+    iguales = all(
+        abs(r["score"] - s) <= 0.01 and r["alertas"] == alertas and r["licitacion_id"] == lid
+        for r, ((s, alertas), lid) in zip(sub, ref[:args.k])
+    )
+    print(f"Top-{args.k} idéntico al bucle (scores ±0.01, alertas): {iguales} | mejor: {top[0]['score']}")
+
+    # Reglas financieras: muchas empresas x todas las licitaciones en una pasada
+    empresas = [{c: round(float(rng.uniform(0.2, 2.0)), 2) for c in CONCEPTOS} for _ in range(args.empresas)]
+    t0 = time.perf_counter()
+    matriz = index.rules.evaluate_many(empresas)
+    t_rules = time.perf_counter() - t0
+    reqs = [l["metadatos_json"]["requisitos_habilitantes"]["financiero"] for l in sample]
+    t0 = time.perf_counter()
+    ref_fin = [[_check_financiero(r, e)[0] for r in reqs] for e in empresas[:5]]
+    t_loop_fin = (time.perf_counter() - t0) * (args.n / len(sample)) * (args.empresas / 5)
+    print(f"Financiero {args.empresas} empresas x {args.n}: {1000 * t_rules:.1f} ms vs {t_loop_fin:.2f}s estimados "
+          f"en bucle | idéntico: {(matriz[:5, :len(sample)] == np.array(ref_fin)).all()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Tiempo de parseo por página: extracción anterior (dos get_text("dict") por
+página + concatenación con +=) vs la pasada única de PDFResilientParser.
+Verifica además que ambos caminos produzcan exactamente las mismas secciones.
+
+Uso:
+    python -m benchmarks.bench_pdf_parser api/test.pdf --repeat 3 --workers 4
+"""
+import argparse
+import time
+import fitz
+import numpy as np
+
+from api.core.pdf_utils import PDFResilientParser
+
+
+def _legacy_process(parser, doc):
+    """Réplica del camino anterior de _process_visual_structure."""
+    chunks = []
+    current_title = "INTRODUCCION"
+    buffer_text = ""
+    for page in doc:
+        # 1ª llamada a get_text("dict"): estadísticas de fuente
+        try:
+            sizes = [s["size"] for b in page.get_text("dict")["blocks"] if "lines" in b
+                     for l in b["lines"] for s in l["spans"]]
+            avg_size = np.mean(sizes) if sizes else 10.0
+        except Exception:
+            avg_size = 10.0
+
+        # 2ª llamada a get_text("dict") + tablas + concatenación con +=
+        tables_md, rects = parser._extract_tables_md(page)
+        content = tables_md + "\n"
+        headers = []
+        for b in page.get_text("dict")["blocks"]:
+            if "lines" in b and not parser._is_inside_table(b["bbox"], rects):
+                for l in b["lines"]:
+                    for s in l["spans"]:
+                        txt = s["text"].strip()
+                        if not txt: continue
+                        if parser._is_header(s, avg_size, txt):
+                            headers.append(txt)
+                            content += f"\n=== {txt} ===\n"
+                        else:
+                            content += txt + " "
+        content = parser._clean_text(content)
+
+        if headers:
+            if buffer_text.strip():
+                chunks.append(parser._package(current_title, buffer_text))
+            current_title = headers[-1]
+            buffer_text = content
+        else:
+            buffer_text += content
+    if buffer_text.strip():
+        chunks.append(parser._package(current_title, buffer_text))
+    return chunks
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdf")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=0, help="Compara también el modo multi-proceso")
+    args = ap.parse_args()
+
+    parser = PDFResilientParser()
+    doc = fitz.open(args.pdf)
+    n = doc.page_count
+
+    best_legacy = best_new = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        legacy = _legacy_process(parser, doc)
+        best_legacy = min(best_legacy, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        nuevo = parser.process(doc)
+        best_new = min(best_new, time.perf_counter() - t0)
+    doc.close()
+
+    iguales = [(c["title"], c["text"]) for c in legacy] == [(c["title"], c["text"]) for c in nuevo]
+    print(f"Páginas: {n} | secciones: {len(nuevo)} | salida idéntica: {iguales}")
+    print(f"Antes  (2x get_text, +=): {1000 * best_legacy / n:.1f} ms/página")
+    print(f"Ahora  (pasada única):    {1000 * best_new / n:.1f} ms/página  "
+          f"(solo parseo: {parser.last_stats['ms_per_page']} ms/página)")
+
+    if args.workers > 1:
+        par = PDFResilientParser(workers=args.workers)
+        par.process(args.pdf)  # calienta el pool (spawn de workers)
+        best_par = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            paralelo = par.process(args.pdf)
+            best_par = min(best_par, time.perf_counter() - t0)
+        par.close()
+        print(f"Paralelo (workers={args.workers}): {1000 * best_par / n:.1f} ms/página  "
+              f"speedup x{best_new / best_par:.1f} | idéntico al serial: {paralelo == nuevo}")
+
+
+if __name__ == "__main__":
+    main()
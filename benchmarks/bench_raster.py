@@ -0,0 +1,83 @@
+"""
+Render de páginas para visión: camino anterior (150 dpi + PNG + decode) vs
+DPI adaptativo con PIL sobre los samples del pixmap. Con --infer-ms simula la
+inferencia (sleep por página) y compara el tiempo total del bucle serial
+contra PageVisionStage, que solapa render e inferencia.
+
+Uso:
+    python -m benchmarks.bench_raster --pdf api/test.pdf
+    python -m benchmarks.bench_raster --pdf api/test.pdf --infer-ms 200
+"""
+import argparse
+import io
+import time
+from types import SimpleNamespace
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from api.core.raster import adaptive_dpi, render_page, pixmap_to_image
+from api.core.page_triage import TriagePolicy
+
+
+def _anterior(page):
+    pix = page.get_pixmap(dpi=150)
+    return Image.open(io.BytesIO(pix.tobytes("png"))).convert("RGB")
+
+
+def _nuevo(page):
+    return pixmap_to_image(render_page(page))
+
+
+def _render(doc, fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        images = [fn(page) for page in doc]
+        best = min(best, time.perf_counter() - t0)
+    return best, images
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf", required=True)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--infer-ms", type=float, default=0, help="Inferencia simulada por página")
+    args = ap.parse_args()
+
+    doc = fitz.open(args.pdf)
+    n = doc.page_count
+    print(f"Páginas: {n} | DPI adaptativo página 1: {adaptive_dpi(doc[0])}")
+    for label, fn in (("150 dpi + PNG", _anterior), ("adaptativo + frombuffer", _nuevo)):
+        t, images = _render(doc, fn, args.repeat)
+        px = sum(im.width * im.height for im in images) / n
+        print(f"  {label:24s}: {1000 * t / n:7.1f} ms/página | {px / 1e6:.2f} Mpx/página")
+
+    if args.infer_ms:
+        from api import orchestrator
+
+        def _fake(images_by_key, task_prompt=None, parciales=None):
+            time.sleep(args.infer_ms / 1000 * len(images_by_key))
+            return {k: "ok" for k in images_by_key}
+
+        # Serial: render y luego inferencia, página a página
+        t0 = time.perf_counter()
+        for page_num, page in enumerate(doc):
+            _fake({page_num: _anterior(page)})
+        t_serial = time.perf_counter() - t0
+
+        pipeline = SimpleNamespace(triage_policy=TriagePolicy(mode="all"), vision_cache=None, inference=None)
+        stage = orchestrator.PageVisionStage(pipeline)
+        stage.analizar = _fake
+        t0 = time.perf_counter()
+        for page_num, page in enumerate(doc):
+            stage.on_page(page_num, page)
+        visual, _, _, _ = stage.finish()
+        t_stage = time.perf_counter() - t0
+        print(f"  Con inferencia de {args.infer_ms:.0f} ms/página: serial {t_serial:.2f}s | "
+              f"PageVisionStage {t_stage:.2f}s ({len(visual)} páginas) x{t_serial / t_stage:.2f}")
+    doc.close()
+
+
+if __name__ == "__main__":
+    main()
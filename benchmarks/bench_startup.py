@@ -0,0 +1,69 @@
+"""
+Presupuesto de tiempo de importación: importa cada módulo en un proceso
+nuevo (como uvicorn --reload) y falla si supera el presupuesto. Muestra las
+importaciones más caras según `python -X importtime`.
+
+Uso:
+    python -m benchmarks.bench_startup                       # main (la API)
+    python -m benchmarks.bench_startup main api.worker --budget 3 --top 15
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+
+def _import_once(module):
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    return wall, proc.returncode, proc.stderr
+
+
+def _heaviest(stderr, top):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative), name.rstrip()))
+        except ValueError:
+            continue
+    # El módulo y lo que importa directamente (la sangría marca la profundidad)
+    rows = [(us, name.strip()) for us, name in rows if (len(name) - len(name.lstrip()) - 1) // 2 <= 1]
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("modules", nargs="*", default=["main"])
+    ap.add_argument("--budget", type=float, default=2.0, help="Segundos máximos por módulo")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    fuera = []
+    for module in args.modules:
+        walls = []
+        for _ in range(args.repeat):
+            wall, code, stderr = _import_once(module)
+            if code != 0:
+                print(f"{module}: error al importar\n{stderr.splitlines()[-1] if stderr else ''}")
+                fuera.append(module)
+                break
+            walls.append(wall)
+        if not walls: continue
+
+        best = min(walls)
+        ok = best <= args.budget
+        if not ok: fuera.append(module)
+        print(f"{module}: {best:.2f}s (presupuesto {args.budget:.1f}s) {'OK' if ok else 'EXCEDIDO'}")
+        for us, name in _heaviest(stderr, args.top):
+            print(f"    {us / 1e6:6.2f}s  {name}")
+
+    sys.exit(1 if fuera else 0)
+
+
+if __name__ == "__main__":
+    main()
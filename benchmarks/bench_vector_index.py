@@ -0,0 +1,95 @@
+"""
+Recall@K y latencia del índice vectorial frente a búsqueda exacta (fuerza
+bruta con el índice deshabilitado), barriendo ef_search (HNSW) o probes
+(ivfflat). Requiere la base con nodos ya cargados.
+
+Uso:
+    python -m benchmarks.bench_vector_index --queries 50 -k 10 --ef-search 20,40,100,200
+    python -m benchmarks.bench_vector_index --rebuild ivfflat --probes 1,5,10,20
+"""
+import argparse
+import time
+import numpy as np
+
+from database.connection import get_db_connection
+from database.vector_index import VECTOR_INDEXES, build_index, set_search_params
+
+
+def _knn(cur, table, column, q, k):
+    # El operando debe ser del tipo de la columna para que use su índice
+    cast = "halfvec(768)" if column == "embedding_half" else "vector"
+    cur.execute(f"SELECT id FROM {table} ORDER BY {column} <=> %s::{cast} LIMIT %s", (q, k))
+    return [r[0] for r in cur.fetchall()]
+
+
+def _exact(conn, table, column, queries, k):
+    cur = conn.cursor()
+    truth = []
+    for q in queries:
+        # Sin índice: scan secuencial exacto
+        cur.execute("SET LOCAL enable_indexscan = off")
+        truth.append(set(_knn(cur, table, column, q, k)))
+        conn.rollback()
+    cur.close()
+    return truth
+
+
+def _sweep(conn, table, column, queries, truth, k, ef_search=None, probes=None):
+    cur = conn.cursor()
+    latencias, recalls = [], []
+    for q, exact in zip(queries, truth):
+        set_search_params(cur, ef_search=ef_search, probes=probes)
+        t0 = time.perf_counter()
+        ids = _knn(cur, table, column, q, k)
+        latencias.append(1000 * (time.perf_counter() - t0))
+        recalls.append(len(exact.intersection(ids)) / max(len(exact), 1))
+        conn.rollback()
+    cur.close()
+    return float(np.mean(recalls)), float(np.percentile(latencias, 50)), float(np.percentile(latencias, 95))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--index", default="idx_nodos_vec", choices=list(VECTOR_INDEXES))
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--ef-search", default="20,40,100,200")
+    ap.add_argument("--probes", default="1,5,10,20")
+    ap.add_argument("--rebuild", default=None, choices=["hnsw", "ivfflat"], help="Reconstruye antes de medir")
+    args = ap.parse_args()
+
+    table, column, _ = VECTOR_INDEXES[args.index]
+    conn = get_db_connection()
+    try:
+        if args.rebuild:
+            print(build_index(conn, args.index, args.rebuild))
+
+        cur = conn.cursor()
+        cur.execute("SELECT amname FROM pg_class c JOIN pg_am a ON a.oid = c.relam WHERE c.relname = %s",
+                    (args.index,))
+        method = cur.fetchone()[0]
+        # Consultas: vectores de la propia tabla (distribución real)
+        cur.execute(f"SELECT {column}::text FROM {table} WHERE {column} IS NOT NULL "
+                    f"ORDER BY random() LIMIT %s", (args.queries,))
+        queries = [r[0] for r in cur.fetchall()]
+        cur.close()
+        conn.rollback()
+
+        t0 = time.perf_counter()
+        truth = _exact(conn, table, column, queries, args.k)
+        exact_ms = 1000 * (time.perf_counter() - t0) / max(len(queries), 1)
+        print(f"Índice {args.index} ({method}) | {len(queries)} consultas | fuerza bruta: {exact_ms:.1f} ms/consulta")
+
+        if method == "hnsw":
+            knobs = [("ef_search", int(x)) for x in args.ef_search.split(",")]
+        else:
+            knobs = [("probes", int(x)) for x in args.probes.split(",")]
+        for knob, value in knobs:
+            recall, p50, p95 = _sweep(conn, table, column, queries, truth, args.k, **{knob: value})
+            print(f"  {knob}={value:4d}: recall@{args.k} {recall:.3f} | p50 {p50:.1f} ms | p95 {p95:.1f} ms")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
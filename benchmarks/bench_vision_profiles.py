@@ -0,0 +1,72 @@
+"""
+Páginas por minuto de cada perfil de visión (gpu / cpu / cpu-fast) sobre
+las páginas de un PDF renderizadas como en PageVisionStage, con el tope de
+tokens de la tarea y el plazo de cada perfil. Cuenta las páginas cuya salida
+cortó el plazo (parciales) y el largo medio de la descripción.
+
+Uso:
+    python -m benchmarks.bench_vision_profiles --pdf test.pdf --pages 6
+    python -m benchmarks.bench_vision_profiles --pdf test.pdf --profiles cpu,cpu-fast --task "<CAPTION>"
+"""
+import argparse
+import gc
+import time
+
+import fitz  # PyMuPDF
+import torch
+
+from api.core.modelo_pixel import ai_engine
+from api.core.raster import render_page, pixmap_to_image
+
+
+def _render(pdf_path, pages, dpi=None):
+    # Mismo render que PageVisionStage (DPI adaptativo) salvo que se fije --dpi
+    with fitz.open(pdf_path) as doc:
+        return [pixmap_to_image(render_page(page, dpi)) for page in list(doc)[:pages]]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf", required=True)
+    ap.add_argument("--pages", type=int, default=6)
+    ap.add_argument("--dpi", type=int, default=None, help="Por defecto, el DPI adaptativo de producción")
+    ap.add_argument("--profiles", default=",".join(ai_engine.VISION_PROFILES))
+    ap.add_argument("--task", default="<MORE_DETAILED_CAPTION>")
+    ap.add_argument("--batch-size", type=int, default=None)
+    args = ap.parse_args()
+
+    images = _render(args.pdf, args.pages, args.dpi)
+    print(f"Páginas: {len(images)} | device: {ai_engine.device} | tarea: {args.task}")
+
+    for name in args.profiles.split(","):
+        profile = ai_engine.resolve_profile(name)
+        if name == "gpu" and ai_engine.device != "cuda":
+            print(f"  {name:9s}: sin CUDA, omitido")
+            continue
+        t0 = time.perf_counter()
+        model, processor = ai_engine.load_model(profile)
+        t_load = time.perf_counter() - t0
+
+        bs = args.batch_size or ai_engine.batch_size_adaptativo()
+        salidas, parciales = [], 0
+        t0 = time.perf_counter()
+        with torch.inference_mode():
+            for i in range(0, len(images), bs):
+                out, cortadas = ai_engine._generate_lote(images[i:i + bs], args.task, profile=profile,
+                                                         model=model, processor=processor)
+                salidas.extend(out)
+                parciales += len(cortadas)
+        elapsed = time.perf_counter() - t0
+
+        largo = sum(len(str(s)) for s in salidas) / max(1, len(salidas))
+        print(f"  {name:9s}: {60 * len(images) / elapsed:6.1f} páginas/min ({elapsed / len(images):.1f}s/página) | "
+              f"max_new_tokens {ai_engine.max_new_tokens_for(args.task, profile)} plazo {profile['max_time']}s/página | "
+              f"parciales {parciales}/{len(images)} | {largo:.0f} caracteres/página | carga {t_load:.1f}s")
+
+        del model, processor
+        gc.collect()
+        if ai_engine.device == "cuda": torch.cuda.empty_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Servidor stub local que imita `models/{model}:generateContent` de Gemini.
+Responde con latencia artificial y, opcionalmente, una fracción de 429 para
+probar la concurrencia, el rate limit y el backoff del orquestador.
+
+Uso:
+    python -m benchmarks.gemini_stub_server --port 8765 --latency 1.5 --error-rate 0.2
+    GEMINI_BASE_URL=http://127.0.0.1:8765 GOOGLE_API_KEY=stub python -m api.worker
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_RESPUESTA_JSON = {
+    "juridico": [],
+    "financiero": [{"concepto": "Indice de Liquidez", "operador": ">=", "valor_requerido": 1.5, "unidad": "veces"}],
+    "experiencia": {"filtros": []}
+}
+
+
+class StubState:
+    def __init__(self, latency, error_rate):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("content-length", 0))
+            self.rfile.read(length)
+
+            with state.lock:
+                state.requests += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+                rate_limited = random.random() < state.error_rate
+                if rate_limited: state.rate_limited += 1
+            try:
+                if rate_limited:
+                    self._send(429, {"error": {"code": 429, "message": "Resource exhausted (stub)",
+                                               "status": "RESOURCE_EXHAUSTED"}})
+                    return
+                time.sleep(state.latency)
+                self._send(200, {
+                    "candidates": [{
+                        "content": {"role": "model", "parts": [{"text": json.dumps(_RESPUESTA_JSON)}]},
+                        "finishReason": "STOP"
+                    }]
+                })
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_stub(port=0, latency=1.0, error_rate=0.0):
+    """Arranca el stub en un hilo. Devuelve (server, state, base_url)."""
+    state = StubState(latency, error_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=1.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    server, state, url = start_stub(args.port, args.latency, args.error_rate)
+    print(f"Stub Gemini en {url} (latencia={args.latency}s, 429={args.error_rate:.0%})")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"requests={state.requests} 429={state.rate_limited} max_concurrentes={state.max_in_flight}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
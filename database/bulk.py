@@ -0,0 +1,152 @@
+import io
+import json
+import os
+import struct
+import numpy as np
+from psycopg2.extras import execute_values
+
+# Cabecera/cola del formato COPY BINARY de Postgres
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_NULL = struct.pack(">i", -1)
+
+# Almacenamiento de embeddings en nodos_vectorizados:
+#   vector  -> solo float32 (embedding_vec)
+#   both    -> float32 + halfvec (ANN sobre halfvec, re-scoring exacto con float32)
+#   halfvec -> solo halfvec (embedding_half): mitad de espacio, sin re-scoring exacto
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "vector")
+
+_NODOS_BASE_COLUMNS = ["seccion_id", "tipo_nodo", "contenido_texto", "metadata_nodo"]
+_EMBEDDING_COLUMNS = {
+    "vector": ["embedding_vec"],
+    "both": ["embedding_vec", "embedding_half"],
+    "halfvec": ["embedding_half"],
+}
+
+
+def reserve_ids(cur, table, n):
+    """Reserva n ids del BIGSERIAL de `table` en un solo round trip."""
+    if n <= 0: return []
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+        (table, n)
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def insert_secciones(cur, pdf_id, secciones):
+    """
+    Inserta todas las secciones de un PDF con un único INSERT multi-fila.
+
+    Los ids se reservan antes del INSERT, así el id i corresponde siempre a
+    secciones[i] (RETURNING de un INSERT multi-fila no garantiza el orden).
+
+    Args:
+        secciones: lista de dicts con titulo, categoria, metadata_extracted,
+                   page_start, page_end y orden (opcionales).
+    Returns:
+        Lista de ids en el mismo orden que `secciones`.
+    """
+    ids = reserve_ids(cur, "secciones_documento", len(secciones))
+    if not ids: return ids
+
+    rows = []
+    for sec_id, sec in zip(ids, secciones):
+        rows.append((
+            sec_id,
+            pdf_id,
+            sec.get("titulo"),
+            sec.get("categoria"),
+            json.dumps(sec.get("metadata_extracted") or {}),
+            sec.get("page_start"),
+            sec.get("page_end"),
+            sec.get("orden"),
+        ))
+
+    execute_values(cur, """
+        INSERT INTO secciones_documento
+            (id, pdf_id, titulo_detectado, categoria_seccion, metadata_extracted, page_start, page_end, orden)
+        VALUES %s
+    """, rows, page_size=len(rows))
+    return ids
+
+
+def copy_nodos(cur, nodos, storage=None):
+    """
+    Escribe nodos_vectorizados con COPY ... FORMAT BINARY.
+
+    Args:
+        nodos: iterable de (seccion_id, tipo_nodo, contenido_texto, metadata_nodo, vector).
+               metadata_nodo puede ser None; vector es cualquier secuencia de floats.
+        storage: 'vector' | 'both' | 'halfvec' (por defecto EMBEDDING_STORAGE).
+    Returns:
+        Número de filas escritas.
+    """
+    emb_columns = _EMBEDDING_COLUMNS[storage or EMBEDDING_STORAGE]
+    encoders = [encode_vector if c == "embedding_vec" else encode_halfvec for c in emb_columns]
+    n_fields = len(_NODOS_BASE_COLUMNS) + len(emb_columns)
+
+    buf = io.BytesIO()
+    buf.write(_COPY_HEADER)
+    n = 0
+    for seccion_id, tipo_nodo, texto, metadata, vec in nodos:
+        buf.write(struct.pack(">h", n_fields))
+        _write_field(buf, struct.pack(">q", seccion_id))
+        _write_field(buf, _encode_text(tipo_nodo))
+        _write_field(buf, _encode_text(texto))
+        _write_field(buf, None if metadata is None else b"\x01" + json.dumps(metadata).encode("utf-8"))
+        for encode in encoders:
+            _write_field(buf, None if vec is None else encode(vec))
+        n += 1
+    buf.write(_COPY_TRAILER)
+
+    if n:
+        buf.seek(0)
+        columns = ", ".join(_NODOS_BASE_COLUMNS + emb_columns)
+        cur.copy_expert(
+            f"COPY nodos_vectorizados ({columns}) FROM STDIN WITH (FORMAT BINARY)", buf
+        )
+    return n
+
+
+def write_document_sections(cur, pdf_id, secciones):
+    """
+    Persiste secciones y nodos de un documento completo en tres sentencias
+    (reserva de ids, INSERT multi-fila de secciones, COPY de nodos).
+
+    Cada sección trae su lista `nodos` de (tipo_nodo, contenido_texto, metadata_nodo, vector);
+    el id de sección se asigna a sus nodos automáticamente.
+    """
+    sec_ids = insert_secciones(cur, pdf_id, secciones)
+    n_nodos = copy_nodos(cur, (
+        (sec_id, tipo, texto, meta, vec)
+        for sec_id, sec in zip(sec_ids, secciones)
+        for tipo, texto, meta, vec in sec.get("nodos", [])
+    ))
+    return sec_ids, n_nodos
+
+
+# --- CODIFICADORES BINARIOS ---
+
+def encode_vector(vec):
+    """Formato binario de pgvector: int16 dim, int16 reservado, dim x float32 big-endian."""
+    arr = np.asarray(vec, dtype=">f4").ravel()
+    return struct.pack(">HH", arr.shape[0], 0) + arr.tobytes()
+
+
+def encode_halfvec(vec):
+    """Formato binario de halfvec: int16 dim, int16 reservado, dim x float16 big-endian."""
+    arr = np.asarray(vec, dtype=np.float32).ravel().astype(">f2")
+    return struct.pack(">HH", arr.shape[0], 0) + arr.tobytes()
+
+
+def _encode_text(value):
+    return None if value is None else str(value).encode("utf-8")
+
+
+def _write_field(buf, payload):
+    if payload is None:
+        buf.write(_NULL)
+    else:
+        buf.write(struct.pack(">i", len(payload)))
+        buf.write(payload)
@@ -0,0 +1,146 @@
+import time
+import numpy as np
+
+from database.bulk import EMBEDDING_STORAGE
+from database.vector_index import build_index, set_search_params
+
+# Candidatos del ANN (halfvec) por cada resultado final cuando se re-puntúa en float32
+RESCORE_OVERSAMPLE = 4
+
+
+def ensure_halfvec_schema(cur):
+    """
+    Columna embedding_half en bases creadas antes de ella (ddl.sql solo corre
+    con un volumen nuevo). halfvec requiere pgvector >= 0.7.
+    """
+    cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    version = tuple(int(x) for x in cur.fetchone()[0].split(".")[:2])
+    if version < (0, 7):
+        raise RuntimeError(f"pgvector {'.'.join(map(str, version))} no tiene halfvec: "
+                           "ejecutar ALTER EXTENSION vector UPDATE (>= 0.7)")
+    cur.execute("ALTER TABLE nodos_vectorizados ADD COLUMN IF NOT EXISTS embedding_half halfvec(768)")
+
+
+def migrate_to_halfvec(conn, batch_size=20000, drop_float32=False):
+    """
+    Migra las filas existentes de nodos_vectorizados a la columna compacta:
+    crea embedding_half si no existe, la llena desde embedding_vec por rangos
+    de id (una transacción por lote, reanudable) y construye idx_nodos_half.
+
+    Con `drop_float32` además vacía embedding_vec y elimina idx_nodos_vec
+    (modo EMBEDDING_STORAGE=halfvec; el espacio se recupera con VACUUM FULL).
+    """
+    cur = conn.cursor()
+    ensure_halfvec_schema(cur)
+    conn.commit()
+    cur.execute("SELECT COALESCE(min(id), 0), COALESCE(max(id), 0) FROM nodos_vectorizados")
+    min_id, max_id = cur.fetchone()
+
+    t0 = time.perf_counter()
+    migrated = 0
+    for start in range(min_id, max_id + 1, batch_size):
+        cur.execute("""
+            UPDATE nodos_vectorizados SET embedding_half = embedding_vec::halfvec(768)
+            WHERE id >= %s AND id < %s AND embedding_half IS NULL AND embedding_vec IS NOT NULL
+        """, (start, start + batch_size))
+        migrated += cur.rowcount
+        conn.commit()
+    print(f" halfvec: {migrated} nodos migrados en {time.perf_counter() - t0:.1f}s")
+
+    # Idempotente: si ya hay un índice válido no se reconstruye
+    cur.execute("""
+        SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass('idx_nodos_half')
+    """)
+    row = cur.fetchone()
+    conn.commit()
+    info = {"index": "idx_nodos_half", "rebuilt": False} if row and row[0] else build_index(conn, "idx_nodos_half")
+
+    if drop_float32:
+        for start in range(min_id, max_id + 1, batch_size):
+            cur.execute("""
+                UPDATE nodos_vectorizados SET embedding_vec = NULL
+                WHERE id >= %s AND id < %s AND embedding_half IS NOT NULL
+            """, (start, start + batch_size))
+            conn.commit()
+        cur.execute("DROP INDEX IF EXISTS idx_nodos_vec")
+        conn.commit()
+        print(" embedding_vec vaciado: ejecutar VACUUM FULL nodos_vectorizados para liberar espacio.")
+
+    cur.close()
+    return {"migrated": migrated, **info}
+
+
+def search_nodos(cur, query_vec, k=10, tipos=None, rescore=True, oversample=RESCORE_OVERSAMPLE,
+                 ef_search=None, storage=None):
+    """
+    Búsqueda de nodos por coseno. Con almacenamiento compacto ('both' o
+    'halfvec') el ANN corre sobre el índice halfvec; con `rescore` los
+    k*oversample candidatos se re-ordenan con la distancia exacta en float32
+    (si la fila todavía la tiene). Devuelve [(id, seccion_id, tipo_nodo, similitud)].
+    """
+    storage = storage or EMBEDDING_STORAGE
+    q = np.asarray(query_vec, dtype=np.float32)
+    filtro, params = "", []
+    if tipos:
+        filtro = "AND tipo_nodo = ANY(%s)"
+        params = [list(tipos)]
+
+    if storage == "vector":
+        set_search_params(cur, ef_search=ef_search)
+        cur.execute(f"""
+            SELECT id, seccion_id, tipo_nodo, 1 - (embedding_vec <=> %s::vector) AS sim
+            FROM nodos_vectorizados
+            WHERE embedding_vec IS NOT NULL {filtro}
+            ORDER BY embedding_vec <=> %s::vector
+            LIMIT %s
+        """, [q] + params + [q, k])
+        return cur.fetchall()
+
+    n_candidatos = k * oversample if rescore else k
+    # ef_search >= candidatos: HNSW no devuelve más de ef_search filas
+    set_search_params(cur, ef_search=max(ef_search or 0, n_candidatos))
+    if not rescore:
+        cur.execute(f"""
+            SELECT id, seccion_id, tipo_nodo, 1 - (embedding_half <=> %s::halfvec(768)) AS sim
+            FROM nodos_vectorizados
+            WHERE embedding_half IS NOT NULL {filtro}
+            ORDER BY embedding_half <=> %s::halfvec(768)
+            LIMIT %s
+        """, [q] + params + [q, k])
+        return cur.fetchall()
+
+    cur.execute(f"""
+        WITH candidatos AS (
+            SELECT id, seccion_id, tipo_nodo, embedding_vec, embedding_half
+            FROM nodos_vectorizados
+            WHERE embedding_half IS NOT NULL {filtro}
+            ORDER BY embedding_half <=> %s::halfvec(768)
+            LIMIT %s
+        ), exactos AS (
+            SELECT id, seccion_id, tipo_nodo,
+                   COALESCE(embedding_vec <=> %s::vector, embedding_half <=> %s::halfvec(768)) AS dist
+            FROM candidatos
+        )
+        SELECT id, seccion_id, tipo_nodo, 1 - dist AS sim
+        FROM exactos
+        ORDER BY dist
+        LIMIT %s
+    """, params + [q, n_candidatos, q, q, k])
+    return cur.fetchall()
+
+
+if __name__ == "__main__":
+    import argparse
+    from database.connection import get_db_connection
+
+    ap = argparse.ArgumentParser(description="Migra nodos_vectorizados a halfvec")
+    ap.add_argument("--batch-size", type=int, default=20000)
+    ap.add_argument("--drop-float32", action="store_true")
+    args = ap.parse_args()
+
+    conn = get_db_connection()
+    try:
+        print(migrate_to_halfvec(conn, args.batch_size, args.drop_float32))
+    finally:
+        conn.close()
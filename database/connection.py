@@ -1,19 +1,165 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from pgvector.psycopg2 import register_vector
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# --- POOL ---
+# psycopg2 solo conserva DB_POOL_MIN conexiones en reposo; las devueltas por encima se cierran
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "4"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Espera máxima por una conexión libre
+# Una conexión ociosa más de esto se valida con SELECT 1 antes de entregarla
+DB_POOL_HEALTHCHECK_SECONDS = float(os.getenv("DB_POOL_HEALTHCHECK_SECONDS", "30"))
+
+
+def _connect_kwargs():
+    return dict(
+        host=os.getenv("DB_HOST", "db"),
+        database=os.getenv("POSTGRES_DB", "licitaciones_db"),
+        user=os.getenv("POSTGRES_USER", "admin"),
+        password=os.getenv("POSTGRES_PASSWORD", "password"),
+        port=os.getenv("DB_PORT", "5432")
+    )
+
+
+def _register_vector(conn):
+    """Adapta numpy <-> vector de pgvector (los embeddings viajan sin .tolist())."""
+    try:
+        register_vector(conn)
+        # register_vector consulta el OID del tipo: cerrar esa transacción para
+        # entregar la conexión limpia (autocommit y CREATE INDEX CONCURRENTLY)
+        conn.commit()
+    except psycopg2.ProgrammingError as e:
+        # Base sin la extensión todavía (antes de aplicar ddl.sql)
+        print(f"pgvector no registrado: {e}")
+        conn.rollback()
+
+
 def get_db_connection():
+    """Conexión nueva fuera del pool (scripts, CLIs). En la API y los workers usar db_connection()."""
     try:
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST", "db"),
-            database=os.getenv("POSTGRES_DB", "licitaciones_db"),
-            user=os.getenv("POSTGRES_USER", "admin"),
-            password=os.getenv("POSTGRES_PASSWORD", "password"),
-            port=os.getenv("DB_PORT", "5432")
-        )
+        conn = psycopg2.connect(**_connect_kwargs())
+        _register_vector(conn)
         return conn
     except Exception as e:
         print(f"Error connecting to database: {e}")
         raise e
+
+
+class _VectorPool(ThreadedConnectionPool):
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        _register_vector(conn)
+        return conn
+
+
+class ConnectionPool:
+    """
+    ThreadedConnectionPool con:
+    - espera acotada cuando el pool está agotado (en vez de PoolError inmediato),
+    - health check de conexiones ociosas / rotas antes de entregarlas,
+    - reseteo al devolver (rollback de transacciones abiertas, autocommit off).
+    """
+
+    def __init__(self, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT):
+        self._pool = _VectorPool(minconn, maxconn, **_connect_kwargs())
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self.timeout = timeout
+        self.pid = os.getpid()
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"Pool de conexiones agotado (espera > {self.timeout}s)")
+        try:
+            # Un intento por conexión ya abierta del pool + una nueva
+            for _ in range(self._pool.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._healthy(conn):
+                    return conn
+                self._pool.putconn(conn, close=True)
+            raise psycopg2.OperationalError("No se pudo obtener una conexión sana del pool")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _healthy(self, conn):
+        if conn.closed: return False
+        idle = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle < DB_POOL_HEALTHCHECK_SECONDS: return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def putconn(self, conn, close=False):
+        try:
+            if not close and not conn.closed:
+                try:
+                    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    if conn.autocommit:
+                        conn.autocommit = False
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    close = True
+            close = close or bool(conn.closed)
+            self._last_used[id(conn)] = time.monotonic()
+            if close: self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool del proceso (se recrea tras un fork: las conexiones no se comparten entre procesos)."""
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
+
+@contextmanager
+def db_connection():
+    """
+    Toma una conexión del pool y la devuelve al salir. El commit es
+    responsabilidad del llamador; lo que quede sin confirmar se revierte.
+    Conexiones que fallan a nivel de red se descartan en vez de reciclarse.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken)
@@ -10,16 +10,25 @@ CREATE TABLE IF NOT EXISTS registro_licitaciones (
     codigo_proceso      VARCHAR(255) UNIQUE NOT NULL,
     entidad  VARCHAR(255), 
     -- Metadata de tiempo y volumen
-    fecha_hora_ingesta  TIMESTAMPTZ DEFAULT NOW(),
+    fecha_hora_ingesta  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     numero_pliegos      INT DEFAULT 0,                
     
     -- Estado del procesamiento global
     estado_actual       VARCHAR(50) DEFAULT 'INGESTA', -- 'INGESTA', 'PROCESANDO', 'INDEXADO', 'ERROR'
     
     -- Metadata Global (Taxonomía inferida, cuantía total, etc.)
-    metadata_global     JSONB DEFAULT '{}'::jsonb
+    metadata_global     JSONB DEFAULT '{}'::jsonb,
+
+    -- Se incrementa en cada (re)ingesta; forma parte del ETag del detalle.
+    -- Bases existentes: database/migrations.py (se aplica al arrancar API y worker)
+    version             INT NOT NULL DEFAULT 1
 );
 
+-- Listado paginado por keyset (fecha_hora_ingesta, id) y filtros del dashboard
+CREATE INDEX IF NOT EXISTS idx_lic_fecha_id ON registro_licitaciones (fecha_hora_ingesta DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_lic_estado_fecha_id ON registro_licitaciones (estado_actual, fecha_hora_ingesta DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_lic_entidad_trgm ON registro_licitaciones USING GIN (entidad gin_trgm_ops);
+
 -- ======================================
 -- REGISTRO DE ARCIHVOS (Los PDFs Crudos)
 -- ======================================
@@ -52,7 +61,8 @@ CREATE TABLE IF NOT EXISTS secciones_documento (
     metadata_extracted  JSONB,       -- { "requisitos": [ ... ] }
     
     page_start          INT,         -- Para referencia visual
-    page_end            INT
+    page_end            INT,
+    orden               INT          -- Posición en el documento (en streaming se insertan desordenadas)
 );
 
 -- Índice para buscar rápido dentro del JSONB (Ej: buscar secciones con 'liquidez')
@@ -75,11 +85,39 @@ CREATE TABLE IF NOT EXISTS nodos_vectorizados (
     -- Metadata específica del nodo
     -- Ej: { "operador": ">=", "valor": 1.5, "unidad": "veces" }
     metadata_nodo       JSONB, 
-    embedding_vec       vector(768) 
+    embedding_vec       vector(768),
+    -- Copia compacta (float16) para ANN; ver EMBEDDING_STORAGE en database/bulk.py
+    embedding_half      halfvec(768)
 );
 
 -- Índices para búsqueda vectorial rápida (Similitud Coseno)
-CREATE INDEX idx_nodos_vec ON nodos_vectorizados USING ivfflat (embedding_vec vector_cosine_ops) WITH (lists = 100);
+-- HNSW no necesita entrenamiento (ivfflat creado sobre la tabla vacía entrena
+-- centroides sin datos). Tras cargas masivas se reconstruye con
+-- `python -m database.vector_index --index idx_nodos_vec`.
+CREATE INDEX idx_nodos_vec ON nodos_vectorizados USING hnsw (embedding_vec vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX idx_nodos_half ON nodos_vectorizados USING hnsw (embedding_half halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- =========================================================================
+-- LICITACIONES PARA MATCHING (Objeto vectorizado + taxonomía UNSPSC)
+-- La recuperación de candidatos se hace en SQL: ANN por coseno sobre
+-- objeto_vec (HNSW) + filtros por estado y solape de códigos (GIN).
+-- =========================================================================
+CREATE TABLE IF NOT EXISTS public_licitacion (
+    id                  BIGSERIAL PRIMARY KEY,
+    codigo_proceso      VARCHAR(255) UNIQUE NOT NULL,
+    entidad             VARCHAR(255),
+    objeto              TEXT,
+    codigos_unspsc      TEXT[] DEFAULT '{}',
+    objeto_vec          vector(768),
+    metadatos_json      JSONB DEFAULT '{}'::jsonb,
+
+    estado              VARCHAR(50) DEFAULT 'ABIERTA', -- 'ABIERTA', 'CERRADA', 'ADJUDICADA'
+    created_at          TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_public_lic_vec ON public_licitacion USING hnsw (objeto_vec vector_cosine_ops);
+CREATE INDEX idx_public_lic_codigos ON public_licitacion USING GIN (codigos_unspsc);
+CREATE INDEX idx_public_lic_estado ON public_licitacion (estado);
 
 -- =========================================================================
 -- NIVEL 5: AUDITORÍA Y LOGS (El Cerebro de Entrenamiento)
@@ -99,4 +137,33 @@ CREATE TABLE IF NOT EXISTS logs_auditoria (
 
 
 CREATE INDEX idx_logs_evento ON logs_auditoria(evento);
-CREATE INDEX idx_logs_fecha ON logs_auditoria(fecha_evento);
\ No newline at end of file
+CREATE INDEX idx_logs_fecha ON logs_auditoria(fecha_evento);
+
+-- =========================================================================
+-- COLA DE INGESTA (Jobs asíncronos)
+-- Los workers reclaman jobs con FOR UPDATE SKIP LOCKED y mantienen un lease
+-- con heartbeats; si un worker muere, el lease expira y otro lo retoma.
+-- =========================================================================
+CREATE TABLE IF NOT EXISTS ingesta_jobs (
+    id                  UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    codigo_proceso      VARCHAR(255) NOT NULL,
+    nombre_archivo      VARCHAR(255),
+    ruta_archivo        TEXT NOT NULL,  -- Debe ser accesible por todos los workers
+
+    estado              VARCHAR(20) DEFAULT 'PENDIENTE', -- 'PENDIENTE', 'EN_PROCESO', 'COMPLETADO', 'FALLIDO'
+    intentos            INT DEFAULT 0,
+    max_intentos        INT DEFAULT 3,
+    disponible_desde    TIMESTAMPTZ DEFAULT NOW(), -- Backoff entre reintentos
+
+    -- Lease del worker que lo procesa
+    worker_id           VARCHAR(255),
+    lease_hasta         TIMESTAMPTZ,
+
+    resultado           JSONB,
+    ultimo_error        TEXT,
+    created_at          TIMESTAMPTZ DEFAULT NOW(),
+    updated_at          TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_jobs_pendientes ON ingesta_jobs (disponible_desde) WHERE estado = 'PENDIENTE';
+CREATE INDEX idx_jobs_lease ON ingesta_jobs (lease_hasta) WHERE estado = 'EN_PROCESO';
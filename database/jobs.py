@@ -0,0 +1,135 @@
+import json
+
+# Estados de ingesta_jobs
+PENDIENTE = "PENDIENTE"
+EN_PROCESO = "EN_PROCESO"
+COMPLETADO = "COMPLETADO"
+FALLIDO = "FALLIDO"
+
+
+class LeaseLost(Exception):
+    """El job pasó a otro worker (lease vencido o reclamado): no se escribe nada más."""
+
+_JOB_COLUMNS = """
+    id, codigo_proceso, nombre_archivo, ruta_archivo, estado, intentos, max_intentos,
+    disponible_desde, worker_id, lease_hasta, resultado, ultimo_error, created_at, updated_at
+"""
+
+
+def enqueue_job(cur, job_id, codigo_proceso, nombre_archivo, ruta_archivo, max_intentos=3):
+    cur.execute("""
+        INSERT INTO ingesta_jobs (id, codigo_proceso, nombre_archivo, ruta_archivo, max_intentos)
+        VALUES (%s, %s, %s, %s, %s)
+        RETURNING id;
+    """, (job_id, codigo_proceso, nombre_archivo, ruta_archivo, max_intentos))
+    return cur.fetchone()[0]
+
+
+def claim_job(cur, worker_id, lease_seconds):
+    """
+    Reclama el siguiente job disponible: uno PENDIENTE cuyo backoff ya venció,
+    o uno EN_PROCESO cuyo lease expiró (worker caído). SKIP LOCKED permite que
+    muchos workers reclamen en paralelo sin bloquearse entre sí.
+    """
+    cur.execute("""
+        UPDATE ingesta_jobs
+        SET estado = 'EN_PROCESO',
+            intentos = intentos + 1,
+            worker_id = %s,
+            lease_hasta = NOW() + %s * INTERVAL '1 second',
+            updated_at = NOW()
+        WHERE id = (
+            SELECT id FROM ingesta_jobs
+            WHERE (estado = 'PENDIENTE' AND disponible_desde <= NOW())
+               OR (estado = 'EN_PROCESO' AND lease_hasta < NOW() AND intentos < max_intentos)
+            ORDER BY disponible_desde
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING id, codigo_proceso, ruta_archivo, intentos, max_intentos;
+    """, (worker_id, lease_seconds))
+    row = cur.fetchone()
+    if not row: return None
+    return {
+        "id": row[0],
+        "codigo_proceso": row[1],
+        "ruta_archivo": row[2],
+        "intentos": row[3],
+        "max_intentos": row[4]
+    }
+
+
+def heartbeat(cur, job_id, worker_id, lease_seconds):
+    """Extiende el lease. Devuelve False si el job ya no pertenece a este worker."""
+    cur.execute("""
+        UPDATE ingesta_jobs
+        SET lease_hasta = NOW() + %s * INTERVAL '1 second', updated_at = NOW()
+        WHERE id = %s AND worker_id = %s AND estado = 'EN_PROCESO'
+    """, (lease_seconds, job_id, worker_id))
+    return cur.rowcount == 1
+
+
+def hold_lease(cur, job_id, worker_id):
+    """
+    Comprueba que el lease sigue vigente y bloquea la fila del job hasta el
+    commit de la transacción en curso: mientras tanto ningún otro worker
+    puede reclamarlo (claim_job salta filas bloqueadas).
+    """
+    cur.execute("""
+        SELECT 1 FROM ingesta_jobs
+        WHERE id = %s AND worker_id = %s AND estado = 'EN_PROCESO' AND lease_hasta > NOW()
+        FOR UPDATE
+    """, (job_id, worker_id))
+    return cur.fetchone() is not None
+
+
+def complete_job(cur, job_id, worker_id, resultado):
+    """Marca COMPLETADO. Devuelve False si el job ya no pertenece a este worker."""
+    cur.execute("""
+        UPDATE ingesta_jobs
+        SET estado = 'COMPLETADO', resultado = %s, lease_hasta = NULL, updated_at = NOW()
+        WHERE id = %s AND worker_id = %s AND estado = 'EN_PROCESO'
+    """, (json.dumps(resultado, default=str), job_id, worker_id))
+    return cur.rowcount == 1
+
+
+def fail_job(cur, job_id, worker_id, error, backoff_seconds):
+    """
+    Registra el fallo. Si quedan intentos, el job vuelve a PENDIENTE con
+    backoff exponencial; si no, queda FALLIDO. Devuelve el estado final, o
+    None si el job ya no pertenece a este worker.
+    """
+    cur.execute("""
+        UPDATE ingesta_jobs
+        SET estado = CASE WHEN intentos < max_intentos THEN 'PENDIENTE' ELSE 'FALLIDO' END,
+            disponible_desde = NOW() + (%s * POWER(2, GREATEST(intentos - 1, 0))) * INTERVAL '1 second',
+            ultimo_error = %s,
+            lease_hasta = NULL,
+            updated_at = NOW()
+        WHERE id = %s AND worker_id = %s AND estado = 'EN_PROCESO'
+        RETURNING estado;
+    """, (backoff_seconds, str(error)[:2000], job_id, worker_id))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def reap_expired(cur):
+    """Marca FALLIDO los jobs con lease vencido que ya agotaron sus intentos."""
+    cur.execute("""
+        UPDATE ingesta_jobs
+        SET estado = 'FALLIDO',
+            ultimo_error = COALESCE(ultimo_error, 'Lease expirado sin heartbeat'),
+            lease_hasta = NULL,
+            updated_at = NOW()
+        WHERE estado = 'EN_PROCESO' AND lease_hasta < NOW() AND intentos >= max_intentos
+        RETURNING id, ruta_archivo;
+    """)
+    return cur.fetchall()
+
+
+def get_job(cur, job_id):
+    cur.execute(f"SELECT {_JOB_COLUMNS} FROM ingesta_jobs WHERE id = %s", (job_id,))
+    row = cur.fetchone()
+    if not row: return None
+    cols = [c.strip() for c in _JOB_COLUMNS.split(",")]
+    return dict(zip(cols, row))
@@ -0,0 +1,51 @@
+from database.bulk import EMBEDDING_STORAGE
+
+# ddl.sql solo corre con un volumen nuevo (docker-entrypoint-initdb.d). Estos
+# pasos llevan una base existente al esquema actual; todos son idempotentes.
+SCHEMA_STEPS = [
+    # Listado por keyset (fecha_hora_ingesta, id): la fecha no puede ser NULL
+    "UPDATE registro_licitaciones SET fecha_hora_ingesta = NOW() WHERE fecha_hora_ingesta IS NULL",
+    "ALTER TABLE registro_licitaciones ALTER COLUMN fecha_hora_ingesta SET DEFAULT NOW()",
+    "ALTER TABLE registro_licitaciones ALTER COLUMN fecha_hora_ingesta SET NOT NULL",
+    "CREATE INDEX IF NOT EXISTS idx_lic_fecha_id ON registro_licitaciones (fecha_hora_ingesta DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_lic_estado_fecha_id ON registro_licitaciones (estado_actual, fecha_hora_ingesta DESC, id DESC)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_lic_entidad_trgm ON registro_licitaciones USING GIN (entidad gin_trgm_ops)",
+    # ETag del detalle: se incrementa en cada (re)ingesta
+    "ALTER TABLE registro_licitaciones ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1",
+    # Orden de las secciones en el documento (streaming las inserta desordenadas)
+    "ALTER TABLE secciones_documento ADD COLUMN IF NOT EXISTS orden INT",
+]
+
+
+def ensure_schema(conn):
+    """
+    Aplica SCHEMA_STEPS en una transacción. Un advisory lock serializa a los
+    procesos que arrancan a la vez (API y workers). Con EMBEDDING_STORAGE
+    'both' o 'halfvec' también crea embedding_half, que el COPY necesita.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('licitaciones_schema'))")
+        for step in SCHEMA_STEPS:
+            cur.execute(step)
+        if EMBEDDING_STORAGE != "vector":
+            from database.compact_embeddings import ensure_halfvec_schema
+            ensure_halfvec_schema(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+if __name__ == "__main__":
+    from database.connection import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        ensure_schema(conn)
+        print("Esquema al día.")
+    finally:
+        conn.close()
@@ -0,0 +1,142 @@
+import math
+import os
+import time
+from psycopg2 import sql
+
+# Índices vectoriales gestionados: nombre -> (tabla, columna, opclass)
+VECTOR_INDEXES = {
+    "idx_nodos_vec": ("nodos_vectorizados", "embedding_vec", "vector_cosine_ops"),
+    "idx_nodos_half": ("nodos_vectorizados", "embedding_half", "halfvec_cosine_ops"),
+    "idx_public_lic_vec": ("public_licitacion", "objeto_vec", "vector_cosine_ops"),
+}
+
+VECTOR_INDEX_METHOD = os.getenv("VECTOR_INDEX_METHOD", "hnsw")  # 'hnsw' | 'ivfflat'
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+# Memoria del build: si el grafo HNSW no cabe, el build se vuelve muchísimo más lento
+INDEX_MAINTENANCE_WORK_MEM = os.getenv("INDEX_MAINTENANCE_WORK_MEM", "2GB")
+INDEX_PARALLEL_WORKERS = int(os.getenv("INDEX_PARALLEL_WORKERS", "2"))
+
+
+def ivfflat_lists(n_rows):
+    """lists recomendado por pgvector: filas/1000 hasta 1M filas, sqrt(filas) por encima."""
+    if n_rows <= 1_000_000:
+        return max(1, n_rows // 1000)
+    return int(math.sqrt(n_rows))
+
+
+def ivfflat_probes(lists):
+    """Punto de partida de probes: sqrt(lists)."""
+    return max(1, int(math.sqrt(lists)))
+
+
+def count_rows(cur, table, column):
+    cur.execute(sql.SQL("SELECT count(*) FROM {} WHERE {} IS NOT NULL").format(
+        sql.Identifier(table), sql.Identifier(column)))
+    return cur.fetchone()[0]
+
+
+def build_index(conn, name="idx_nodos_vec", method=None, lists=None, m=None, ef_construction=None,
+                maintenance_work_mem=None, concurrently=True):
+    """
+    Construye (o reconstruye) un índice vectorial después de una carga masiva.
+
+    ivfflat entrena sus centroides con los datos presentes al crearlo, por eso
+    hay que construirlo con la tabla ya cargada; `lists` sale del número de
+    filas si no se pasa. HNSW no necesita entrenamiento pero el build es caro:
+    se corre con `maintenance_work_mem` alto y workers paralelos.
+
+    Con `concurrently` se construye un índice nuevo sin bloquear escrituras y
+    luego se intercambia por el anterior. Requiere autocommit (se restaura al
+    final). Devuelve un dict con los parámetros usados y el tiempo del build.
+    """
+    table, column, opclass = VECTOR_INDEXES[name]
+    method = method or VECTOR_INDEX_METHOD
+    if method not in ("hnsw", "ivfflat"):
+        raise ValueError(f"Método de índice no soportado: {method}")
+
+    prev_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        n_rows = count_rows(cur, table, column)
+
+        if method == "ivfflat":
+            lists = lists or ivfflat_lists(n_rows)
+            with_params = sql.SQL("lists = {}").format(sql.Literal(int(lists)))
+            params = {"lists": lists, "probes_sugerido": ivfflat_probes(lists)}
+        else:
+            m = m or HNSW_M
+            ef_construction = ef_construction or HNSW_EF_CONSTRUCTION
+            with_params = sql.SQL("m = {}, ef_construction = {}").format(
+                sql.Literal(int(m)), sql.Literal(int(ef_construction)))
+            params = {"m": m, "ef_construction": ef_construction}
+
+        cur.execute("SET maintenance_work_mem = %s", (maintenance_work_mem or INDEX_MAINTENANCE_WORK_MEM,))
+        cur.execute("SET max_parallel_maintenance_workers = %s", (INDEX_PARALLEL_WORKERS,))
+
+        tmp_name = f"{name}_new"
+        t0 = time.perf_counter()
+        # Restos de un build concurrente interrumpido (queda un índice INVALID)
+        cur.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(tmp_name)))
+        cur.execute(sql.SQL("CREATE INDEX {concurrently} {idx} ON {table} USING {method} ({column} {opclass}) WITH ({params})").format(
+            concurrently=sql.SQL("CONCURRENTLY") if concurrently else sql.SQL(""),
+            idx=sql.Identifier(tmp_name),
+            table=sql.Identifier(table),
+            method=sql.SQL(method),
+            column=sql.Identifier(column),
+            opclass=sql.SQL(opclass),
+            params=with_params
+        ))
+        cur.execute(sql.SQL("DROP INDEX {concurrently} IF EXISTS {idx}").format(
+            concurrently=sql.SQL("CONCURRENTLY") if concurrently else sql.SQL(""),
+            idx=sql.Identifier(name)))
+        cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(sql.Identifier(tmp_name), sql.Identifier(name)))
+        build_s = time.perf_counter() - t0
+
+        cur.execute("RESET maintenance_work_mem")
+        cur.execute("RESET max_parallel_maintenance_workers")
+        info = {"index": name, "method": method, "rows": n_rows, "build_s": round(build_s, 2), **params}
+        info.update(index_size(cur, name))
+        cur.close()
+        print(f" Índice {name} ({method}) construido sobre {n_rows} filas en {build_s:.1f}s: {params}")
+        return info
+    finally:
+        conn.autocommit = prev_autocommit
+
+
+def index_size(cur, name):
+    cur.execute("SELECT pg_relation_size(%s::regclass)", (name,))
+    return {"size_mb": round(cur.fetchone()[0] / (1024 * 1024), 1)}
+
+
+def set_search_params(cur, ef_search=None, probes=None):
+    """
+    Ajusta recall/latencia de las consultas ANN de la transacción actual
+    (SET LOCAL): hnsw.ef_search para HNSW, ivfflat.probes para ivfflat.
+    """
+    if ef_search is not None:
+        cur.execute("SET LOCAL hnsw.ef_search = %s", (int(ef_search),))
+    if probes is not None:
+        cur.execute("SET LOCAL ivfflat.probes = %s", (int(probes),))
+
+
+if __name__ == "__main__":
+    import argparse
+    from database.connection import get_db_connection
+
+    ap = argparse.ArgumentParser(description="Construye o reconstruye los índices vectoriales")
+    ap.add_argument("--index", default="idx_nodos_vec", choices=list(VECTOR_INDEXES))
+    ap.add_argument("--method", default=None, choices=["hnsw", "ivfflat"])
+    ap.add_argument("--lists", type=int, default=None)
+    ap.add_argument("--m", type=int, default=None)
+    ap.add_argument("--ef-construction", type=int, default=None)
+    ap.add_argument("--maintenance-work-mem", default=None)
+    args = ap.parse_args()
+
+    conn = get_db_connection()
+    try:
+        print(build_index(conn, args.index, args.method, args.lists, args.m, args.ef_construction,
+                          args.maintenance_work_mem))
+    finally:
+        conn.close()
@@ -19,8 +19,10 @@ except ImportError:
 print("\n----- 2. PRUEBA DE IMPORTACIÓN AI_ENGINE (FLORENCE) -----")
 try:
     # Intentamos importar tal cual lo hace tu app
-    from api.core.modelo_pixel.ai_engine import analizar_imagen_con_florence, model, processor
+    from api.core.modelo_pixel.ai_engine import analizar_imagen_con_florence, get_florence
     print("✅ Importación EXITOSA.")
+    # La carga es perezosa: forzamos aquí la del modelo
+    model, processor = get_florence()
     print(f"Model config: {model.config._name_or_path}")
     print(f"Processor: {type(processor)}")
     print(f"Dtype del modelo: {model.dtype}")
@@ -39,8 +39,20 @@ export default function App() {
 
             const data = await response.json();
 
+            // La ingesta es asíncrona: esperamos a que el worker termine el job
+            let job = null;
+            do {
+                await new Promise((r) => setTimeout(r, 3000));
+                const jobResponse = await fetch(`${API_URL}/licitaciones/jobs/${data.job_id}`);
+                job = await jobResponse.json();
+            } while (job.estado === "PENDIENTE" || job.estado === "EN_PROCESO");
+
+            if (job.estado !== "COMPLETADO") {
+                throw new Error(`Error: ${job.ultimo_error || job.estado}`);
+            }
+
             // Fetch details immediately to show full data
-            const detailResponse = await fetch(`${API_URL}/licitaciones/${data.licitacion_id}`);
+            const detailResponse = await fetch(`${API_URL}/licitaciones/${data.codigo_proceso}`);
             const detailData = await detailResponse.json();
 
             setResult(detailData);
@@ -1,6 +1,10 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from api.v1.router import api_router
+from database.connection import close_pool, db_connection
+from database.migrations import ensure_schema
+from api.core.model_registry import registry
 
 app = FastAPI(title="Licitaciones API")
 
@@ -11,10 +15,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+def migrate_schema():
+    # Bases creadas con un ddl.sql anterior: columnas e índices que el código ya usa
+    try:
+        with db_connection() as conn:
+            ensure_schema(conn)
+    except Exception as e:
+        print(f"❌ No se pudo verificar el esquema: {e}")
+
+@app.on_event("startup")
+def warmup_models():
+    # Sin bloquear el arranque: los endpoints de lectura sirven mientras tanto
+    registry.warmup()
+
+@app.on_event("shutdown")
+def shutdown_db_pool():
+    close_pool()
+
 @app.get("/")
 def root():
     return {"message": "API up and running"}
+
+@app.get("/health/live")
+def health_live():
+    """El proceso responde (no comprueba dependencias)."""
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def health_ready():
+    """Listo para tráfico: base de datos accesible y modelos de READY_REQUIRES_MODELS cargados."""
+    checks = {"models": registry.status()}
+    try:
+        with db_connection() as conn:
+            conn.cursor().execute("SELECT 1")
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+
+    ready = checks["database"] == "ok" and registry.ready()
+    return JSONResponse({"status": "ready" if ready else "not_ready", **checks},
+                        status_code=200 if ready else 503)